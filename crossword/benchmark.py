@@ -0,0 +1,544 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+
+from crossword import Crossword
+from generate import INFERENCES, CrosswordCreator
+from wordfile import write
+
+# Rough English letter frequencies, for synthetic words whose overlaps
+# prune about as much as real ones
+FREQUENCIES = {
+    "E": 12.7, "T": 9.1, "A": 8.2, "O": 7.5, "I": 7.0, "N": 6.7, "S": 6.3,
+    "H": 6.1, "R": 6.0, "D": 4.3, "L": 4.0, "C": 2.8, "U": 2.8, "M": 2.4,
+    "W": 2.4, "F": 2.2, "G": 2.0, "Y": 2.0, "P": 1.9, "B": 1.5, "V": 1.0,
+    "K": 0.8, "J": 0.2, "X": 0.2, "Q": 0.1, "Z": 0.1,
+}
+
+# Largest number of letter comparisons the set-based ordering is timed on
+REFERENCE_LIMIT = 5 * 10 ** 7
+
+
+def random_words(count, lengths, seed=0):
+    """
+    Return `count` distinct random words with lengths drawn evenly from
+    `lengths` and letters drawn by English frequency.
+    """
+    rng = random.Random(seed)
+    letters = list(FREQUENCIES)
+    weights = list(FREQUENCIES.values())
+    words = set()
+    while len(words) < count:
+        length = rng.choice(lengths)
+        words.add("".join(rng.choices(letters, weights, k=length)))
+    return words
+
+
+def random_structure(size, density=0.3, seed=0):
+    """
+    Return the lines of a random `size` x `size` structure, with runs of
+    open cells carved across and down until about `density` of the
+    cells are open.
+    """
+    rng = random.Random(seed)
+    grid = [["#"] * size for _ in range(size)]
+    carved = 0
+    while carved < density * size * size:
+        length = rng.randint(3, min(size, 9))
+        i = rng.randrange(size)
+        j = rng.randrange(size - length + 1)
+        across = rng.random() < 0.5
+        for k in range(length):
+            cell = (i, j + k) if across else (j + k, i)
+            if grid[cell[0]][cell[1]] == "#":
+                grid[cell[0]][cell[1]] = "_"
+                carved += 1
+    return ["".join(row) for row in grid]
+
+
+def pairwise_overlaps(variables):
+    """The original overlap computation, comparing every pair."""
+    overlaps = dict()
+    for v1 in variables:
+        for v2 in variables:
+            if v1 == v2:
+                continue
+            cells1 = v1.cells
+            cells2 = v2.cells
+            intersection = set(cells1).intersection(cells2)
+            if not intersection:
+                overlaps[v1, v2] = None
+            else:
+                intersection = intersection.pop()
+                overlaps[v1, v2] = (
+                    cells1.index(intersection),
+                    cells2.index(intersection)
+                )
+    return overlaps
+
+
+def scan_neighbors(variables, overlaps, var):
+    """The original `neighbors`, scanning every variable."""
+    return set(
+        v for v in variables
+        if v != var and overlaps[v, var]
+    )
+
+
+def set_revise(crossword, domains, x, y):
+    """The original `revise` over domains stored as sets of words."""
+    match = crossword.overlaps[x, y]
+    revised = False
+    if match is not None:
+        i, j = match
+        yj = []
+        for yword in domains[y]:
+            yj.append(yword[j])
+        temp_domain = domains[x].union({})
+        for xword in temp_domain:
+            if xword[i] not in yj:
+                domains[x].remove(xword)
+                revised = True
+    return revised
+
+
+def set_order(crossword, domains, var):
+    """The original `order_domain_values` over sets of words."""
+    neighbors = crossword.neighbors(var)
+    constraints = []
+    for word in domains[var]:
+        count = 0
+        for neighbor in neighbors:
+            i, j = crossword.overlaps[var, neighbor]
+            for neighbor_word in domains[neighbor]:
+                if word[i] != neighbor_word[j]:
+                    count += 1
+        constraints.append((word, count))
+    return constraints
+
+
+def list_ac3(creator):
+    """
+    The original `ac3` queue: a list of unordered pairs, popped from
+    the front and searched before each append, revising whichever end
+    `tuple` happens to give first. Return the number of revisions made.
+    """
+    arcs = []
+    for var in creator.domains:
+        for neighbor in creator.crossword.neighbors(var):
+            temp_arc = set((var, neighbor))
+            if temp_arc not in arcs:
+                arcs.append(temp_arc)
+    revisions = 0
+    while len(arcs) != 0:
+        x, y = tuple(arcs.pop(0))
+        revisions += 1
+        if creator.revise(x, y):
+            if not creator.domains[x]:
+                return revisions
+            for neighbor in creator.crossword.neighbors(x):
+                if neighbor == y:
+                    continue
+                arc = set([neighbor, x])
+                if arc not in arcs:
+                    arcs.append(arc)
+    return revisions
+
+
+def directed_ac3(crossword, revise):
+    """
+    Revise every directed arc until none changes, with `revise(x, y)`
+    for either domain engine, so both reach the same fixpoint.
+    Return the number of revisions made.
+    """
+    arcs = deque(
+        (x, y) for x in crossword.variables for y in crossword.neighbors(x)
+    )
+    queued = set(arcs)
+    revisions = 0
+    while arcs:
+        x, y = arcs.popleft()
+        queued.discard((x, y))
+        revisions += 1
+        if revise(x, y):
+            for z in crossword.neighbors(x) - {y}:
+                if (z, x) not in queued:
+                    queued.add((z, x))
+                    arcs.append((z, x))
+    return revisions
+
+
+def compare(name, structure, words):
+    """
+    Time node and arc consistency and value ordering with set and bitset
+    domains on one puzzle, check they agree, and print a table row.
+    """
+    crossword = Crossword(structure, words)
+
+    start = time.perf_counter()
+    domains = {
+        var: {word for word in crossword.words if len(word) == var.length}
+        for var in crossword.variables
+    }
+    revisions = directed_ac3(
+        crossword, lambda x, y: set_revise(crossword, domains, x, y)
+    )
+    set_ac3 = time.perf_counter() - start
+
+    start = time.perf_counter()
+    creator = CrosswordCreator(crossword)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    creator.enforce_node_consistency()
+    creator.ac3()
+    bit_ac3 = time.perf_counter() - start
+    for var in crossword.variables:
+        assert set(creator.domain_words(var)) == domains[var]
+
+    # Order the values of the variable with the most work to do
+    var = max(crossword.variables, key=lambda v: len(domains[v]) * sum(
+        len(domains[n]) for n in crossword.neighbors(v)
+    ))
+    work = len(domains[var]) * sum(
+        len(domains[n]) for n in crossword.neighbors(var)
+    )
+    start = time.perf_counter()
+    ordered = creator.order_domain_values(var, dict())
+    bit_order = time.perf_counter() - start
+    line = (f"{name:<24}{len(crossword.words):>8}{revisions:>7}"
+            f"{set_ac3:>10.4f}{bit_ac3:>10.4f}{set_ac3 / bit_ac3:>8.1f}x"
+            f"{build:>9.4f}")
+    if work <= REFERENCE_LIMIT:
+        start = time.perf_counter()
+        counts = dict(set_order(crossword, domains, var))
+        set_order_time = time.perf_counter() - start
+        expected = sorted(counts.values())
+        assert [counts[word] for word in ordered] == expected
+        line += (f"{set_order_time:>10.4f}{bit_order:>10.4f}"
+                 f"{set_order_time / bit_order:>8.1f}x")
+    else:
+        line += f"{'-':>10}{bit_order:>10.4f}{'-':>9}"
+    print(line)
+
+
+def compare_grid(size):
+    """
+    Time finding overlaps and every variable's neighbors on a random
+    structure, pairwise as originally and from the cell index, and
+    print a table row.
+    """
+    with tempfile.NamedTemporaryFile("w", suffix=".txt") as f:
+        f.write("\n".join(random_structure(size)))
+        f.flush()
+        start = time.perf_counter()
+        crossword = Crossword(f.name, os.devnull)
+        indexed = time.perf_counter() - start
+    variables = crossword.variables
+
+    start = time.perf_counter()
+    overlaps = pairwise_overlaps(variables)
+    pairwise = time.perf_counter() - start
+    assert {
+        pair: overlap for pair, overlap in overlaps.items() if overlap
+    } == crossword.overlaps
+
+    start = time.perf_counter()
+    scanned = {
+        var: scan_neighbors(variables, overlaps, var) for var in variables
+    }
+    scan = time.perf_counter() - start
+    start = time.perf_counter()
+    stored = {var: crossword.neighbors(var) for var in variables}
+    lookup = time.perf_counter() - start
+    assert scanned == stored
+
+    print(f"{f'{size}x{size}':<10}{len(variables):>6}"
+          f"{len(crossword.overlaps) // 2:>9}{pairwise:>11.4f}"
+          f"{indexed:>11.4f}{pairwise / indexed:>8.0f}x"
+          f"{scan:>11.4f}{lookup:>11.6f}{scan / lookup:>8.0f}x")
+
+
+def compare_ac3(size, count, seed=0):
+    """
+    Time the original list queue and the deque of directed arcs
+    enforcing arc consistency on a random structure with `count` random
+    words, count the arcs the list queue leaves inconsistent, and print
+    a table row.
+    """
+    with tempfile.NamedTemporaryFile("w", suffix=".txt") as f:
+        f.write("\n".join(random_structure(size, 0.35, seed)))
+        f.flush()
+        lengths = sorted({
+            var.length for var in Crossword(f.name, os.devnull).variables
+        })
+        with tempfile.NamedTemporaryFile("w", suffix=".txt") as w:
+            w.write("\n".join(random_words(count, lengths, seed)))
+            w.flush()
+            crossword = Crossword(f.name, w.name)
+
+    creator = CrosswordCreator(crossword)
+    start = time.perf_counter()
+    revisions = list_ac3(creator)
+    listed = time.perf_counter() - start
+
+    # Arcs along which the list queue's result can still be revised
+    left = sum(
+        creator.revise(x, y)
+        for x in crossword.variables for y in crossword.neighbors(x)
+    )
+
+    creator = CrosswordCreator(crossword)
+    start = time.perf_counter()
+    creator.ac3()
+    directed = time.perf_counter() - start
+    left_directed = sum(
+        creator.revise(x, y)
+        for x in crossword.variables for y in crossword.neighbors(x)
+    )
+    assert left_directed == 0
+    print(f"{f'{size}x{size}':<10}{len(crossword.overlaps):>6}"
+          f"{revisions:>10}{left:>10}{listed:>10.4f}{directed:>10.4f}"
+          f"{listed / directed:>9.1f}x")
+
+
+def compare_consistency(size, seed=0):
+    """
+    Fill a random structure with random letters, and time checking each
+    variable of the resulting assignment with the full `consistent` and
+    with `consistent_value`, then print a table row.
+    """
+    rng = random.Random(seed)
+    with tempfile.NamedTemporaryFile("w", suffix=".txt") as f:
+        f.write("\n".join(random_structure(size, 0.35, seed)))
+        f.flush()
+        crossword = Crossword(f.name, os.devnull)
+    letters = [
+        rng.choices(list(FREQUENCIES), list(FREQUENCIES.values()), k=size)
+        for _ in range(size)
+    ]
+
+    # Keep one variable for each word, so the assignment is consistent
+    assignment = dict()
+    for var in crossword.variables:
+        word = "".join(letters[i][j] for i, j in var.cells)
+        if word not in assignment.values():
+            assignment[var] = word
+    crossword.words = set(assignment.values())
+    creator = CrosswordCreator(crossword)
+    creator.used = set(assignment.values())
+    assert creator.consistent(assignment)
+
+    start = time.perf_counter()
+    for var in assignment:
+        creator.consistent(assignment)
+    full = (time.perf_counter() - start) / len(assignment)
+    start = time.perf_counter()
+    for var, word in assignment.items():
+        creator.used.discard(word)
+        assert creator.consistent_value(var, word, assignment)
+        creator.used.add(word)
+    incremental = (time.perf_counter() - start) / len(assignment)
+    print(f"{f'{size}x{size}':<10}{len(assignment):>6}"
+          f"{full * 1e6:>12.1f}{incremental * 1e6:>14.2f}"
+          f"{full / incremental:>9.0f}x")
+
+
+# Run in a fresh interpreter so a search can be stopped at a time limit;
+# prints a JSON object of search statistics
+SEARCH = """
+import json, sys
+from crossword import Crossword
+from generate import CrosswordCreator
+structure, words, inference = sys.argv[1:]
+creator = CrosswordCreator(Crossword(structure, words), inference)
+assignment = creator.solve()
+print(json.dumps(dict(creator.stats, solved=assignment is not None)))
+"""
+
+
+def compare_search(name, structure, words, timeout):
+    """
+    Solve a puzzle with each kind of inference in a new process and
+    print its nodes, pruned words and seconds, or that it timed out.
+    """
+    line = f"{name:<16}"
+    solved = None
+    for inference in INFERENCES:
+        try:
+            stats = json.loads(subprocess.run(
+                [sys.executable, "-c", SEARCH, structure, words, inference],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                capture_output=True, text=True, check=True, timeout=timeout
+            ).stdout)
+        except subprocess.TimeoutExpired:
+            line += f"{'timeout':>14}{'-':>10}{'-':>10}"
+            continue
+        line += (f"{stats['nodes']:>14}{stats['pruned']:>10}"
+                 f"{stats['seconds']:>10.4f}")
+        solved = stats["solved"]
+    outcome = {None: "timeout", True: "solved", False: "no solution"}
+    print(f"{line}  {outcome[solved]}")
+
+
+# Run in a fresh interpreter so nothing is loaded beforehand; loads the
+# puzzle once to time it and again under tracemalloc for the peak memory
+# allocated, which leaves out mapped pages, since peak RSS would include
+# the parent's; prints a JSON object of load measurements
+LOAD = """
+import json, sys, time, tracemalloc
+from crossword import Crossword
+from generate import CrosswordCreator
+structure, words = sys.argv[1:]
+start = time.perf_counter()
+creator = CrosswordCreator(Crossword(structure, words))
+seconds = time.perf_counter() - start
+creator.enforce_node_consistency()
+creator.ac3()
+ac3_seconds = time.perf_counter() - start - seconds
+variables = len(creator.crossword.variables)
+del creator
+tracemalloc.start()
+creator = CrosswordCreator(Crossword(structure, words))
+creator.enforce_node_consistency()
+creator.ac3()
+print(json.dumps({
+    "seconds": seconds,
+    "ac3_seconds": ac3_seconds,
+    "peak_mb": tracemalloc.get_traced_memory()[1] / 2 ** 20,
+    "variables": variables,
+}))
+"""
+
+
+def compare_vocabulary(count, size, seed=0):
+    """
+    Load `count` random words for a random `size` x `size` structure
+    from a word list and from a compiled word file, each in a new
+    process, and print the time to load the puzzle, the time for AC-3
+    and the peak memory each one allocates.
+    """
+    lengths = list(range(3, 16))
+    with tempfile.TemporaryDirectory() as temp:
+        structure = os.path.join(temp, "structure.txt")
+        with open(structure, "w") as f:
+            f.write("\n".join(random_structure(size, 0.35, seed)))
+        words = random_words(count, lengths, seed)
+        text = os.path.join(temp, "words.txt")
+        with open(text, "w") as f:
+            f.write("\n".join(words))
+        compiled = os.path.join(temp, "words.words")
+        start = time.perf_counter()
+        write(compiled, words)
+        build = time.perf_counter() - start
+        del words
+
+        line = f"{count:<10}"
+        for path in (text, compiled):
+            result = json.loads(subprocess.run(
+                [sys.executable, "-c", LOAD, structure, path],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                capture_output=True, text=True, check=True
+            ).stdout)
+            line += (f"{result['seconds']:>10.3f}{result['ac3_seconds']:>8.3f}"
+                     f"{result['peak_mb']:>10.1f}")
+        size_mb = os.path.getsize(compiled) / 2 ** 20
+        print(f"{line}{result['variables']:>6}{build:>9.2f}"
+              f"{size_mb:>11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare set and bitset crossword domains."
+    )
+    parser.add_argument(
+        "--structure", default=os.path.join("data", "structure2.txt")
+    )
+    parser.add_argument(
+        "--words", type=int, nargs="*", default=[10000, 100000],
+        help="sizes of synthetic word lists (default: 10000 100000)"
+    )
+    parser.add_argument(
+        "--grids", type=int, nargs="*", default=[15, 31, 61],
+        help="sizes of random square structures to find overlaps in "
+             "(default: 15 31 61)"
+    )
+    parser.add_argument(
+        "--vocabularies", type=int, nargs="*", default=[100000, 500000],
+        help="sizes of synthetic word lists to load as text and as word "
+             "files (default: 100000 500000)"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=20,
+        help="seconds each search may take (default: 20)"
+    )
+    args = parser.parse_args()
+
+    print(f"{'words':<24}{'count':>8}{'arcs':>7}{'set AC-3':>10}"
+          f"{'bit AC-3':>10}{'speedup':>9}{'index':>9}"
+          f"{'set order':>10}{'bit order':>10}{'speedup':>9}")
+    compare("words2", args.structure, os.path.join("data", "words2.txt"))
+    lengths = sorted({
+        var.length for var in Crossword(args.structure, os.devnull).variables
+    })
+    for count in args.words:
+        with tempfile.NamedTemporaryFile("w", suffix=".txt") as f:
+            f.write("\n".join(random_words(count, lengths)))
+            f.flush()
+            compare(f"random-{count}", args.structure, f.name)
+
+
+    print()
+    print(f"{'grid':<10}{'vars':>6}{'overlaps':>9}{'pairwise':>11}"
+          f"{'indexed':>11}{'speedup':>9}{'scan':>11}{'stored':>11}"
+          f"{'speedup':>9}")
+    for size in args.grids:
+        compare_grid(size)
+
+    print()
+    print(f"{'grid':<10}{'arcs':>6}{'revised':>10}{'left':>10}{'list':>10}"
+          f"{'deque':>10}{'speedup':>9}")
+    for size in args.grids:
+        compare_ac3(size, 20000)
+
+    print()
+    print(f"{'grid':<10}{'vars':>6}{'full (us)':>12}{'variable (us)':>14}"
+          f"{'speedup':>9}")
+    for size in args.grids:
+        compare_consistency(size)
+
+    print()
+    print(f"{'words':<10}{'text load':>10}{'AC-3':>8}{'peak (MB)':>10}"
+          f"{'file load':>10}{'AC-3':>8}{'peak (MB)':>10}{'vars':>6}"
+          f"{'compile':>9}{'file (MB)':>11}")
+    for count in args.vocabularies:
+        compare_vocabulary(count, 21)
+
+    print()
+    print(f"{'puzzle':<16}" + "".join(
+        f"{f'{inference} nodes':>14}{'pruned':>10}{'seconds':>10}"
+        for inference in INFERENCES
+    ))
+    for k in range(3):
+        compare_search(
+            f"structure{k}", os.path.join("data", f"structure{k}.txt"),
+            os.path.join("data", f"words{k}.txt"), args.timeout
+        )
+    words = os.path.join("data", "words2.txt")
+    for size in (11, 13):
+        for seed in range(3):
+            with tempfile.NamedTemporaryFile("w", suffix=".txt") as f:
+                f.write("\n".join(random_structure(size, 0.35, seed)))
+                f.flush()
+                compare_search(
+                    f"random-{size}-{seed}", f.name, words, args.timeout
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+from wordfile import MappedWordIndex, is_word_file
+
+
 class Variable():
 
     ACROSS = "across"
@@ -9,6 +12,7 @@ class Variable():
         self.j = j
         self.direction = direction
         self.length = length
+        self.hash = hash((self.i, self.j, self.direction, self.length))
         self.cells = []
         for k in range(self.length):
             self.cells.append(
@@ -17,7 +21,8 @@ class Variable():
             )
 
     def __hash__(self):
-        return hash((self.i, self.j, self.direction, self.length))
+        # Computed once, as variables are hashed on every arc queued
+        return self.hash
 
     def __eq__(self, other):
         return (
@@ -57,9 +62,13 @@ class Crossword():
                         row.append(False)
                 self.structure.append(row)
 
-        # Save vocabulary list
-        with open(words_file) as f:
-            self.words = set(f.read().upper().splitlines())
+        # Save vocabulary list, or memory-map it if it has been compiled
+        # into a word file, which is already bucketed and indexed
+        if is_word_file(words_file):
+            self.words = MappedWordIndex.load(words_file)
+        else:
+            with open(words_file) as f:
+                self.words = set(f.read().upper().splitlines())
 
         # Determine variable set
         self.variables = set()
@@ -108,26 +117,38 @@ class Crossword():
         # For any pair of variables v1, v2, their overlap is either:
         #    None, if the two variables do not overlap; or
         #    (i, j), where v1's ith character overlaps v2's jth character
-        self.overlaps = dict()
-        for v1 in self.variables:
-            for v2 in self.variables:
-                if v1 == v2:
-                    continue
-                cells1 = v1.cells
-                cells2 = v2.cells
-                intersection = set(cells1).intersection(cells2)
-                if not intersection:
-                    self.overlaps[v1, v2] = None
-                else:
-                    intersection = intersection.pop()
-                    self.overlaps[v1, v2] = (
-                        cells1.index(intersection),
-                        cells2.index(intersection)
-                    )
+        # Index the variables covering each cell, so overlaps are found in
+        # one pass over the cells rather than by comparing every pair
+        covering = dict()
+        for variable in self.variables:
+            for k, cell in enumerate(variable.cells):
+                covering.setdefault(cell, []).append((variable, k))
+        self.overlaps = Overlaps()
+        adjacent = {variable: [] for variable in self.variables}
+        for found in covering.values():
+            for v1, i in found:
+                for v2, j in found:
+                    if v1 != v2:
+                        self.overlaps[v1, v2] = (i, j)
+                        adjacent[v1].append((v2, i, j))
+
+        # For each variable, a tuple of (neighbor, i, j), where the
+        # variable's ith character overlaps the neighbor's jth character
+        self.adjacent = {
+            variable: tuple(found) for variable, found in adjacent.items()
+        }
+        self.neighbor_sets = {
+            variable: frozenset(neighbor for neighbor, _, _ in found)
+            for variable, found in self.adjacent.items()
+        }
 
     def neighbors(self, var):
         """Given a variable, return set of overlapping variables."""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
-        )
+        return self.neighbor_sets[var]
+
+
+class Overlaps(dict):
+    """Overlaps of pairs of variables, None for pairs that do not overlap."""
+
+    def __missing__(self, key):
+        return None
@@ -0,0 +1,116 @@
+from bisect import bisect_left
+
+
+class WordIndex():
+    """
+    Vocabulary bucketed by word length, in which a set of words of one
+    length is an int bitset: bit k is set if the bucket's kth word, in
+    sorted order, is in the set.
+
+    `masks[length][i]` maps each letter to the bitset of words of
+    `length` with that letter at position `i`, so filtering a domain by
+    a letter is a bitwise AND and its size is a popcount.
+    """
+
+    def __init__(self, words):
+        self.words = {}
+        for word in sorted(words):
+            self.words.setdefault(len(word), []).append(word)
+
+        self.masks = {}
+        for length, bucket in self.words.items():
+            positions = []
+            for i in range(length):
+                ids = {}
+                for k, word in enumerate(bucket):
+                    ids.setdefault(word[i], []).append(k)
+                positions.append({
+                    letter: bitset(found, len(bucket))
+                    for letter, found in ids.items()
+                })
+            self.masks[length] = positions
+
+    def __contains__(self, word):
+        try:
+            self.word_id(word)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        for bucket in self.words.values():
+            yield from bucket
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.words.values())
+
+    def full(self, length):
+        """Return the bitset of every word of `length`."""
+        return (1 << len(self.words.get(length, ()))) - 1
+
+    def members(self, length, domain):
+        """Yield the words of `length` in bitset `domain`, in order."""
+        bucket = self.words.get(length, ())
+        for k in ids(domain):
+            yield bucket[k]
+
+    def word_id(self, word):
+        """Return the position of `word` in its length's bucket."""
+        bucket = self.words.get(len(word), ())
+        k = bisect_left(bucket, word)
+        if k == len(bucket) or bucket[k] != word:
+            raise KeyError(word)
+        return k
+
+    def position(self, length, i):
+        """
+        Return the dict from each letter to the bitset of words of
+        `length` with that letter at position `i`.
+        """
+        if length not in self.masks:
+            return {}
+        return self.masks[length][i]
+
+    def letters(self, length, i, domain):
+        """
+        Return a dict from each letter at position `i` of the words of
+        `length` in `domain` to the number of those words with it there.
+        """
+        counts = {}
+        for letter, mask in self.masks[length][i].items():
+            count = (mask & domain).bit_count()
+            if count:
+                counts[letter] = count
+        return counts
+
+    def supported(self, x_length, i, y_length, j, y_domain):
+        """
+        Return the bitset of words of `x_length` whose letter at position
+        `i` is the letter at position `j` of some word of `y_length` in
+        `y_domain`.
+        """
+        x_masks = self.position(x_length, i)
+        result = 0
+        for letter, mask in self.position(y_length, j).items():
+            if mask & y_domain:
+                result |= x_masks.get(letter, 0)
+        return result
+
+
+def bitset(ids, size):
+    """Return the int with bits `ids` set, out of `size` bits."""
+    bits = bytearray((size + 7) // 8)
+    for k in ids:
+        bits[k >> 3] |= 1 << (k & 7)
+    return int.from_bytes(bits, "little")
+
+
+def ids(domain):
+    """Yield the positions of the set bits of `domain`, lowest first."""
+    # Scanning the binary string is linear in the width of the bitset,
+    # where clearing the lowest bit each time would be quadratic
+    bits = bin(domain)[:1:-1]
+    k = bits.find("1")
+    while k != -1:
+        yield k
+        k = bits.find("1", k + 1)
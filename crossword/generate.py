@@ -1,20 +1,120 @@
-import sys
+import argparse
+import random
+import time
+from collections import deque
 
 from crossword import *
+from domains import WordIndex
+
+# Inference made after each assignment during backtracking: none,
+# forward checking of the assigned variable's neighbors, or maintaining
+# arc consistency from it
+INFERENCES = ["none", "forward", "mac"]
+
+# Ways to choose the next variable: fewest remaining values then most
+# neighbors, or fewest remaining values per neighbor
+VARIABLE_ORDERS = ["mrv", "dom/deg"]
+
+# Ways to order a variable's values: sorted, least constraining first,
+# or shuffled
+VALUE_ORDERS = ["sorted", "lcv", "random"]
+
+
+# Number of nodes between checks of whether a search has been cancelled
+CANCEL_CHECK = 256
+
+
+class Restart(Exception):
+    """Raised by backtracking once a search has used up its node budget."""
+
+
+class Cancelled(Exception):
+    """Raised by backtracking once a search has been cancelled."""
 
 
 class CrosswordCreator():
 
-    def __init__(self, crossword):
+    def __init__(self, crossword, inference="mac", variable_order="mrv",
+                 value_order="sorted", seed=None):
         """
         Create new CSP crossword generate.
+        If `seed` is given, ties between variables are broken at random,
+        as are ties between values ordered by "lcv".
         """
+        if inference not in INFERENCES:
+            raise ValueError(f"unknown inference: {inference}")
+        if variable_order not in VARIABLE_ORDERS:
+            raise ValueError(f"unknown variable order: {variable_order}")
+        if value_order not in VALUE_ORDERS:
+            raise ValueError(f"unknown value order: {value_order}")
         self.crossword = crossword
-        self.domains = {
-            var: self.crossword.words.copy()
-            for var in self.crossword.variables
+        self.inference = inference
+        self.variable_order = variable_order
+        self.value_order = value_order
+        self.rng = None if seed is None else random.Random(seed)
+        words = self.crossword.words
+        if isinstance(words, WordIndex):
+            self.index = words
+        else:
+            self.index = WordIndex(words)
+
+        # Variables of each length, which can never share a word
+        self.by_length = dict()
+        for var in self.crossword.variables:
+            self.by_length.setdefault(var.length, []).append(var)
+
+        # Each domain is a bitset over the words of the variable's length,
+        # and variables of one length start out sharing a single bitset
+        self.domains = dict()
+        for length, variables in self.by_length.items():
+            full = self.index.full(length)
+            for var in variables:
+                self.domains[var] = full
+
+        # Every pruning of a domain, as (variable, bitset of words removed),
+        # so backtracking restores exactly what was pruned since a mark
+        self.trail = []
+
+        # Words in the assignment being searched, which no other variable
+        # may use
+        self.used = set()
+
+        # Node count at which the current search run must restart, and an
+        # event, such as a `multiprocessing.Event`, that cancels search
+        # once set
+        self.max_nodes = None
+        self.cancel = None
+        self.stats = {
+            "nodes": 0, "backtracks": 0, "pruned": 0, "restarts": 0,
+            "seconds": 0, "cancelled": False
         }
 
+    def domain_words(self, var):
+        """
+        Return the words in the domain of `var`, in sorted order.
+        """
+        return list(self.index.members(var.length, self.domains[var]))
+
+    def prune(self, var, keep):
+        """
+        Remove every word not in bitset `keep` from the domain of `var`,
+        recording the words removed on the trail.
+        Return True if any were removed.
+        """
+        removed = self.domains[var] & ~keep
+        if not removed:
+            return False
+        self.trail.append((var, removed))
+        self.domains[var] &= keep
+        self.stats["pruned"] += removed.bit_count()
+        return True
+
+    def undo(self, mark):
+        """Restore every word pruned since the trail had length `mark`."""
+        while len(self.trail) > mark:
+            var, removed = self.trail.pop()
+            self.domains[var] |= removed
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -85,13 +185,37 @@ class CrosswordCreator():
 
         img.save(filename)
 
-    def solve(self):
+    def solve(self, budgets=None):
         """
         Enforce node and arc consistency, and then solve the CSP.
+
+        If `budgets` is given, search restarts from scratch each time it
+        has explored the next number of nodes in `budgets`, and gives up,
+        returning None, if `budgets` runs out first. Search also returns
+        None once `self.cancel` is set.
         """
+        start = time.perf_counter()
+        self.used = set()
         self.enforce_node_consistency()
-        self.ac3()
-        return self.backtrack(dict())
+        result = None
+        if self.ac3():
+            root = len(self.trail)
+            for budget in [None] if budgets is None else budgets:
+                if budget is not None:
+                    self.max_nodes = self.stats["nodes"] + budget
+                try:
+                    result = self.backtrack(dict())
+                    break
+                except Restart:
+                    self.undo(root)
+                    self.used = set()
+                    self.stats["restarts"] += 1
+                except Cancelled:
+                    self.stats["cancelled"] = True
+                    break
+            self.max_nodes = None
+        self.stats["seconds"] = time.perf_counter() - start
+        return result
 
     def enforce_node_consistency(self):
         """
@@ -99,12 +223,10 @@ class CrosswordCreator():
         (Remove any values that are inconsistent with a variable's unary
          constraints; in this case, the length of the word.)
         """
+        # Domains only ever index words of the right length, so this
+        # just clears any words of other lengths
         for variable in self.domains:
-            deep_domain = set(self.domains[variable]).union({})
-            for word in deep_domain:
-                if variable.length != len(word):
-                    self.domains[variable].remove(word)
-        
+            self.domains[variable] &= self.index.full(variable.length)
 
     def revise(self, x, y):
         """
@@ -116,54 +238,54 @@ class CrosswordCreator():
         False if no revision was made.
         """
         match = self.crossword.overlaps[x,y]
-        revised = False
-        if match != None:
-            i,j = match
-            yj = []
-            for yword in self.domains[y]:
-                yj.append(yword[j])
-            # Create temp domain which doesn't change size on iteration
-            temp_domain = self.domains[x].union({})
-            for xword in temp_domain:
-                if xword[i] not in yj:
-                    self.domains[x].remove(xword)
-                    revised = True
-        return revised
-
-        
+        if match is None:
+            return False
+        i,j = match
+        # Words of x whose overlapping letter some word of y shares
+        supported = self.index.supported(
+            x.length, i, y.length, j, self.domains[y]
+        )
+        return self.prune(x, supported)
 
-    def ac3(self, arcs=None):
+    def ac3(self, arcs=None, assignment=None):
         """
         Update `self.domains` such that each variable is arc consistent.
         If `arcs` is None, begin with initial list of all arcs in the problem.
         Otherwise, use `arcs` as the initial list of arcs to make consistent.
+        Each arc is a pair (x, y), for which `x` is revised against `y`.
+        Arcs into variables in `assignment`, if given, are not queued.
 
         Return True if arc consistency is enforced and no domains are empty;
         return False if one or more domains end up empty.
         """
         # Create list of all arcs in problem when default arcs = None
-        if arcs == None:
-            arcs = []
-            for var in self.domains:
-                for neighbor in self.crossword.neighbors(var):
-                    temp_arc = set((var,neighbor))
-                    if temp_arc not in arcs:
-                        arcs.append(temp_arc)
-        while len(arcs) != 0:
-            x,y = tuple(arcs.pop(0))
+        if arcs is None:
+            arcs = [
+                (var, neighbor) for var in self.domains
+                for neighbor, _, _ in self.crossword.adjacent[var]
+            ]
+        # Queue of arcs to revise, and the same arcs as a set, so an arc
+        # already waiting is not queued twice
+        queue = deque(arcs)
+        queued = set(queue)
+        while queue:
+            arc = queue.popleft()
+            queued.discard(arc)
+            x,y = arc
             if self.revise(x,y):
-                if len(self.domains[x]) == 0:
+                if not self.domains[x]:
                     return False
-                for neighbor in self.crossword.neighbors(x):
+                for neighbor, _, _ in self.crossword.adjacent[x]:
                     if neighbor == y:
                         continue
-                    arc = set([neighbor,x])
-                    if arc not in arcs:
-                        arcs.append(arc)
+                    if assignment is not None and neighbor in assignment:
+                        continue
+                    arc = (neighbor, x)
+                    if arc not in queued:
+                        queued.add(arc)
+                        queue.append(arc)
         return True
 
-        
-
 
     def assignment_complete(self, assignment):
         """
@@ -192,18 +314,44 @@ class CrosswordCreator():
                 return False
         # Check if all are arc consistent
         for variable in assignment:
-            for neighbor in self.crossword.neighbors(variable):
-                if neighbor in assignment.keys():
-                    overlap = self.crossword.overlaps[neighbor,variable]
-                    if overlap != None:
-                        i,j = overlap
-                        if assignment[neighbor][i] != assignment[variable][j]:
-                            return False
+            for neighbor, i, j in self.crossword.adjacent[variable]:
+                if neighbor in assignment:
+                    if assignment[variable][i] != assignment[neighbor][j]:
+                        return False
         return True
 
         raise NotImplementedError
 
+    def consistent_value(self, var, value, assignment):
+        """
+        Return True if assigning `value` to `var` keeps `assignment`, which
+        must already be consistent, consistent; return False otherwise.
+
+        Only `var` is checked: that `value` has the right length, is not
+        in `self.used`, and agrees with each assigned neighbor.
+        """
+        if var.length != len(value) or value in self.used:
+            return False
+        for neighbor, i, j in self.crossword.adjacent[var]:
+            if neighbor in assignment:
+                if value[i] != assignment[neighbor][j]:
+                    return False
+        return True
+
+    def domain_values(self, var, assignment):
+        """
+        Return the values in the domain of `var` in the order they are
+        tried, by `self.value_order`.
+        """
+        if self.value_order == "lcv":
+            return self.order_domain_values(var, assignment)
+        values = self.domain_words(var)
+        if self.value_order == "random":
+            (self.rng or random).shuffle(values)
+        return values
+
     # Implement key function for order_domain_values sort
+    @staticmethod
     def takeSecond(elem):
         return elem[1]
 
@@ -214,18 +362,35 @@ class CrosswordCreator():
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
         """
-        # Creates list of neighbors which aren't in assignment
-        neighbors = list(set(self.crossword.neighbors(var)) - set(assignment.keys()))
+        # Creates list of neighbors which aren't in assignment, with
+        # where they overlap var
+        neighbors = [
+            (neighbor, i, j) for neighbor, i, j in self.crossword.adjacent[var]
+            if neighbor not in assignment
+        ]
+
+        # For each neighbor, how many of its words have each letter where
+        # it overlaps var; every other word of theirs is ruled out
+        overlaps = []
+        for neighbor, i, j in neighbors:
+            size = self.domains[neighbor].bit_count()
+            letters = self.index.letters(
+                neighbor.length, j, self.domains[neighbor]
+            )
+            overlaps.append((i, size, letters))
+
+        # Shuffled first when seeded, so the stable sort breaks ties at
+        # random
+        words = self.domain_words(var)
+        if self.rng is not None:
+            self.rng.shuffle(words)
 
         constraints = []
         # Iterate and add constraint count to list
-        for word in self.domains[var]:
+        for word in words:
             count = 0
-            for neighbor in neighbors:
-                i,j = self.crossword.overlaps[var,neighbor]
-                for neighbor_word in self.domains[neighbor]:
-                    if word[i] != neighbor_word[j]:
-                        count += 1
+            for i, size, letters in overlaps:
+                count += size - letters.get(word[i], 0)
             constraints.append((word,count))
         
         # Sort list and create list of just words
@@ -248,15 +413,23 @@ class CrosswordCreator():
         """
         # List of unassigned variables
         variables = list(self.domains.keys() - assignment.keys())
-        
+
+        if self.variable_order == "dom/deg":
+            def ratio(var):
+                degree = max(1, len(self.crossword.adjacent[var]))
+                return self.domains[var].bit_count() / degree
+            least = min(ratio(var) for var in variables)
+            choice = [var for var in variables if ratio(var) == least]
+            return self.rng.choice(choice) if self.rng else choice[0]
+
         # Determine lowest domain
         choice = []
         for var in variables:
             if len(choice) == 0:
                 choice.append(var)
-            elif len(self.domains[var]) == len(self.domains[choice[0]]):
+            elif self.domains[var].bit_count() == self.domains[choice[0]].bit_count():
                 choice.append(var)
-            elif len(self.domains[var]) < len(self.domains[choice[0]]):
+            elif self.domains[var].bit_count() < self.domains[choice[0]].bit_count():
                 choice = [var]
         if len(choice) == 1:
             return choice[0]
@@ -266,11 +439,13 @@ class CrosswordCreator():
         for var in choice:
             if len(choice_degree) == 0:
                 choice_degree.append(var)
-            elif len(self.crossword.neighbors(var)) == len(self.crossword.neighbors(choice_degree[0])):
+            elif len(self.crossword.adjacent[var]) == len(self.crossword.adjacent[choice_degree[0]]):
                 choice_degree.append(var)
-            elif len(self.crossword.neighbors(var)) > len(self.crossword.neighbors(choice_degree[0])):
+            elif len(self.crossword.adjacent[var]) > len(self.crossword.adjacent[choice_degree[0]]):
                 choice_degree = [var]
-        
+
+        if self.rng is not None:
+            return self.rng.choice(choice_degree)
         return choice_degree[0]
 
         raise NotImplementedError
@@ -287,15 +462,75 @@ class CrosswordCreator():
         if self.assignment_complete(assignment):
             return assignment
         var = self.select_unassigned_variable(assignment)
-        test = assignment
-        for value in self.domains[var]:
-            assignment.update({var:value})
-            if self.consistent(assignment):
-                result = self.backtrack(assignment)
-                if result != False:
-                    return result
-            assignment.pop(var)
-        return False
+        for value in self.domain_values(var, assignment):
+            self.stats["nodes"] += 1
+            if self.max_nodes is not None and \
+                    self.stats["nodes"] > self.max_nodes:
+                raise Restart
+            if self.cancel is not None and \
+                    self.stats["nodes"] % CANCEL_CHECK == 0 and \
+                    self.cancel.is_set():
+                raise Cancelled
+            if self.consistent_value(var, value, assignment):
+                assignment.update({var:value})
+                self.used.add(value)
+                # Undo any inference when this value fails
+                mark = len(self.trail)
+                if self.infer(var, value, assignment):
+                    result = self.backtrack(assignment)
+                    if result is not None:
+                        return result
+                self.undo(mark)
+                self.used.discard(value)
+                assignment.pop(var)
+        self.stats["backtracks"] += 1
+        return None
+
+    def infer(self, var, value, assignment):
+        """
+        Prune the domains of unassigned variables after `var` has been
+        assigned `value`, recording every pruned word on the trail.
+
+        The domain of `var` becomes just `value`, which is removed from
+        every other variable of its length. With forward checking, each
+        unassigned neighbor is then revised against `var`; when
+        maintaining arc consistency, the arcs into `var` and into every
+        variable that lost `value` are queued, and any revision also
+        queues the arcs into the revised variable from its other
+        unassigned neighbors.
+
+        Return False if some domain is left empty, True otherwise.
+        """
+        if self.inference == "none":
+            return True
+        bit = 1 << self.index.word_id(value)
+        self.prune(var, bit)
+        pruned = [var]
+        for other in self.by_length[var.length]:
+            if other != var and other not in assignment:
+                if self.prune(other, ~bit):
+                    if not self.domains[other]:
+                        return False
+                    pruned.append(other)
+
+        if self.inference == "mac":
+            # Every variable whose domain shrank, including those that
+            # lost `value` to the uniqueness constraint, has its arcs from
+            # unassigned neighbors queued
+            arcs = list(dict.fromkeys(
+                (neighbor, x) for x in pruned
+                for neighbor, _, _ in self.crossword.adjacent[x]
+                if neighbor not in assignment
+            ))
+            return self.ac3(arcs, assignment)
+        arcs = [
+            (neighbor, var) for neighbor, _, _ in self.crossword.adjacent[var]
+            if neighbor not in assignment
+        ]
+        for x, y in arcs:
+            if self.revise(x, y) and not self.domains[x]:
+                return False
+        return True
 
 
         raise NotImplementedError
@@ -303,18 +538,24 @@ class CrosswordCreator():
 
 def main():
 
-    # Check usage
-    if len(sys.argv) not in [3, 4]:
-        sys.exit("Usage: python generate.py structure words [output]")
-
     # Parse command-line arguments
-    structure = sys.argv[1]
-    words = sys.argv[2]
-    output = sys.argv[3] if len(sys.argv) == 4 else None
+    parser = argparse.ArgumentParser(description="Generate a crossword.")
+    parser.add_argument("structure")
+    parser.add_argument("words")
+    parser.add_argument("output", nargs="?")
+    parser.add_argument(
+        "--inference", choices=INFERENCES, default="mac",
+        help="inference after each assignment (default: mac)"
+    )
+    parser.add_argument(
+        "--stats", action="store_true", help="print search statistics"
+    )
+    args = parser.parse_args()
+    output = args.output
 
     # Generate crossword
-    crossword = Crossword(structure, words)
-    creator = CrosswordCreator(crossword)
+    crossword = Crossword(args.structure, args.words)
+    creator = CrosswordCreator(crossword, args.inference)
     assignment = creator.solve()
 
     # Print result
@@ -324,6 +565,9 @@ def main():
         creator.print(assignment)
         if output:
             creator.save(assignment, output)
+    if args.stats:
+        for key, value in creator.stats.items():
+            print(f"{key}: {value}")
 
 
 if __name__ == "__main__":
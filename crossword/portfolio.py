@@ -0,0 +1,202 @@
+import argparse
+import itertools
+import multiprocessing
+import os
+import queue
+import time
+
+from crossword import Crossword
+from generate import CrosswordCreator
+
+# Nodes in the shortest search run between restarts; the ith run may
+# explore luby(i) times as many
+LUBY_UNIT = 64
+
+# Seconds cancelled workers have to report before they are terminated
+GRACE = 5
+
+# (variable order, value order) for each worker; the first searches once
+# without restarts or randomness, and every later worker cycles through
+# the rest with its own seed and Luby restarts
+STRATEGIES = [
+    ("mrv", "sorted"),
+    ("mrv", "lcv"),
+    ("dom/deg", "random"),
+    ("mrv", "random"),
+    ("dom/deg", "lcv"),
+]
+
+
+def luby(i):
+    """Return term `i`, from 1, of the Luby sequence 1, 1, 2, 1, 1, 2, 4..."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while i != (1 << k) - 1:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+def budgets(unit):
+    """Yield node budgets of `unit` times the Luby sequence, forever."""
+    for i in itertools.count(1):
+        yield unit * luby(i)
+
+
+def run_worker(k, structure, words, seed, unit, cancel, results):
+    """
+    Solve a crossword with the kth worker's strategy in `STRATEGIES` and put
+    (k, assignment or None, stats) on the `results` queue, where the
+    assignment is a list of ((i, j, direction), word).
+    """
+    # Only the first worker runs the deterministic search, so workers
+    # beyond the number of strategies never repeat it
+    restarts = k > 0
+    if restarts:
+        strategy = STRATEGIES[1 + (k - 1) % (len(STRATEGIES) - 1)]
+    else:
+        strategy = STRATEGIES[0]
+    variable_order, value_order = strategy
+    crossword = Crossword(structure, words)
+    creator = CrosswordCreator(
+        crossword, "mac", variable_order, value_order,
+        seed=None if not restarts else seed
+    )
+    creator.cancel = cancel
+    assignment = creator.solve(budgets(unit) if restarts else None)
+    stats = dict(
+        creator.stats, worker=k, variable_order=variable_order,
+        value_order=value_order, luby=restarts
+    )
+    if assignment is not None:
+        assignment = [
+            ((var.i, var.j, var.direction), word)
+            for var, word in assignment.items()
+        ]
+    results.put((k, assignment, stats))
+
+
+def solve_portfolio(structure, words, workers=None, seed=0, unit=LUBY_UNIT,
+                    timeout=None):
+    """
+    Solve the crossword in `structure` with `words` in `workers`
+    processes at once, each with its own strategy and random seed, and
+    cancel the rest as soon as one finds a complete assignment or shows
+    there is none, or after `timeout` seconds.
+
+    Return (crossword, assignment or None, list of each worker's stats,
+    or None for a worker that had to be terminated).
+    """
+    workers = workers or os.cpu_count()
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    cancel = context.Event()
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=run_worker, daemon=True,
+            args=(k, structure, words, seed + k, unit, cancel, results)
+        )
+        for k in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    found = None
+    stats = [None] * workers
+    reported = 0
+    deadline = None if timeout is None else time.monotonic() + timeout
+    cancelled_at = None
+    while reported < workers:
+        try:
+            k, assignment, worker_stats = results.get(timeout=1)
+        except queue.Empty:
+            # Stop waiting for workers that died, or that have not
+            # reported within GRACE seconds of being cancelled
+            now = time.monotonic()
+            if not any(process.is_alive() for process in processes):
+                break
+            if deadline is not None and now > deadline:
+                cancel.set()
+            if cancel.is_set():
+                cancelled_at = cancelled_at or now
+                if now - cancelled_at > GRACE:
+                    break
+            continue
+        stats[k] = worker_stats
+        reported += 1
+        if assignment is not None and found is None:
+            found = assignment
+        # A search that ended uncancelled without an assignment has
+        # shown there is none
+        if assignment is not None or not worker_stats["cancelled"]:
+            cancel.set()
+
+    for process in processes:
+        process.join(GRACE if cancel.is_set() else 0)
+        if process.is_alive():
+            process.terminate()
+
+    crossword = Crossword(structure, words)
+    if found is None:
+        return crossword, None, stats
+    variables = {
+        (var.i, var.j, var.direction): var for var in crossword.variables
+    }
+    return crossword, {variables[key]: word for key, word in found}, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a crossword with a portfolio of searches."
+    )
+    parser.add_argument("structure")
+    parser.add_argument("words")
+    parser.add_argument("output", nargs="?")
+    parser.add_argument(
+        "--workers", type=int, help="processes to search in (default: CPUs)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--unit", type=int, default=LUBY_UNIT,
+        help=f"nodes in the shortest run between restarts "
+             f"(default: {LUBY_UNIT})"
+    )
+    parser.add_argument("--timeout", type=float, help="seconds to search")
+    parser.add_argument(
+        "--stats", action="store_true", help="print each worker's statistics"
+    )
+    args = parser.parse_args()
+
+    crossword, assignment, stats = solve_portfolio(
+        args.structure, args.words, args.workers, args.seed, args.unit,
+        args.timeout
+    )
+    creator = CrosswordCreator(crossword)
+    if assignment is None:
+        print("No solution.")
+    else:
+        creator.print(assignment)
+        if args.output:
+            creator.save(assignment, args.output)
+    if args.stats:
+        for k, worker_stats in enumerate(stats):
+            if worker_stats is None:
+                print(f"worker {k}: terminated")
+                continue
+            print(f"worker {k}: {worker_stats['variable_order']} / "
+                  f"{worker_stats['value_order']}"
+                  f"{' / luby' if worker_stats['luby'] else ''}: "
+                  f"{worker_stats['nodes']} nodes, "
+                  f"{worker_stats['restarts']} restarts, "
+                  f"{worker_stats['seconds']:.3f}s"
+                  f"{', cancelled' if worker_stats['cancelled'] else ''}")
+
+
+if __name__ == "__main__":
+    main()
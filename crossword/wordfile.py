@@ -0,0 +1,201 @@
+import argparse
+import json
+import mmap
+import os
+import time
+from array import array
+from collections.abc import Mapping, Sequence
+
+from domains import WordIndex
+
+MAGIC = b"CWWORDS1"
+VERSION = 1
+
+
+class WordTable(Sequence):
+    """
+    Read-only sorted sequence of the words of one length, stored as one
+    UTF-8 blob plus an offsets array; each word is decoded only when it
+    is accessed.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self[i] for i in range(*k.indices(len(self)))]
+        if k < 0:
+            k += len(self)
+        start, end = self.offsets[k], self.offsets[k + 1]
+        return bytes(self.blob[start:end]).decode("utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class MaskTable(Mapping):
+    """
+    Mapping from each word length to its list of per-position letter
+    bitsets, read from the word file the first time the length is used,
+    so lengths no variable has are never turned into ints.
+    """
+
+    def __init__(self, buffer, buckets):
+        self.buffer = buffer
+        self.buckets = buckets
+        self.cache = {}
+
+    def __getitem__(self, length):
+        if length not in self.cache:
+            bucket = self.buckets[length]
+            size = (bucket["count"] + 7) // 8
+            self.cache[length] = [
+                {
+                    letter: int.from_bytes(
+                        self.buffer[offset:offset + size], "little"
+                    )
+                    for letter, offset in position.items()
+                }
+                for position in bucket["masks"]
+            ]
+        return self.cache[length]
+
+    def __contains__(self, length):
+        return length in self.buckets
+
+    def __iter__(self):
+        return iter(self.buckets)
+
+    def __len__(self):
+        return len(self.buckets)
+
+
+class MappedWordIndex(WordIndex):
+    """
+    `WordIndex` over a word file memory-mapped from disk. Words stay in
+    the file until they are looked up, and only the letter bitsets of
+    the lengths a puzzle uses are read, however large the vocabulary.
+    """
+
+    def __init__(self, buffer, buckets):
+        self.buffer = buffer
+        self.words = {}
+        for length, bucket in buckets.items():
+            start, end = bucket["words"]
+            offsets = bucket["offsets"]
+            self.words[length] = WordTable(
+                buffer[start:end],
+                buffer[offsets:offsets + 4 * (bucket["count"] + 1)].cast("I")
+            )
+        self.masks = MaskTable(buffer, buckets)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map the word file at `path`."""
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise Exception(f"{path} is not a word file")
+            size = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(size))
+            data = len(MAGIC) + 8 + size
+            if header["version"] != VERSION:
+                raise Exception(f"{path} has unsupported version")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(mapped)[data:]
+        buckets = {
+            int(length): bucket
+            for length, bucket in header["buckets"].items()
+        }
+        return cls(buffer, buckets)
+
+
+def is_word_file(path):
+    """Return True if the file at `path` starts like a word file."""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write(path, words):
+    """
+    Write a word file of `words`, bucketed by length. Each bucket holds
+    its sorted words as a UTF-8 blob with offsets, then for each position
+    and letter the bitset of words with that letter there, every section
+    aligned to 8 bytes.
+    """
+    index = WordIndex(words)
+    sections = []
+    buckets = {}
+    position = 0
+
+    def add(data):
+        nonlocal position
+        position += -position % 8
+        sections.append((position, data))
+        start = position
+        position += len(data)
+        return start
+
+    for length, bucket in sorted(index.words.items()):
+        encoded = [word.encode("utf-8") for word in bucket]
+        offsets = [0]
+        for word in encoded:
+            offsets.append(offsets[-1] + len(word))
+        if offsets[-1] >= 1 << 32:
+            raise Exception(f"words of length {length} are too long")
+        blob = b"".join(encoded)
+        start = add(blob)
+        size = (len(bucket) + 7) // 8
+        buckets[length] = {
+            "count": len(bucket),
+            "words": [start, start + len(blob)],
+            "offsets": add(array("I", offsets).tobytes()),
+            "masks": [
+                {
+                    letter: add(mask.to_bytes(size, "little"))
+                    for letter, mask in sorted(masks.items())
+                }
+                for masks in index.masks[length]
+            ],
+        }
+
+    # The data follows the header, padded to 8 bytes, so its offsets are
+    # relative to the start of the data and the header can be any length
+    header = json.dumps({
+        "version": VERSION,
+        "num_words": len(index),
+        "buckets": buckets,
+    }).encode("utf-8")
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % 8)
+    data = len(MAGIC) + 8 + len(header)
+
+    temp = f"{path}.tmp"
+    with open(temp, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for start, section in sections:
+            f.write(b"\0" * (data + start - f.tell()))
+            f.write(section)
+    os.replace(temp, path)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compile a word list into a memory-mapped word file."
+    )
+    parser.add_argument("words", help="text file of words, one per line")
+    parser.add_argument("output", help="word file to write")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with open(args.words) as f:
+        index = write(args.output, f.read().upper().splitlines())
+    print(f"Wrote {len(index)} words in {len(index.words)} lengths to "
+          f"{args.output} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import degrees
+
+
+def read_queries(filename):
+    """
+    Yield (source, target) pairs from a CSV file with one query per row.
+    Each side may be a person's name or IMDB id. A header row of
+    `source,target` is skipped.
+    """
+    with open(filename, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if len(row) < 2 or [cell.lower() for cell in row[:2]] == [
+                "source", "target"
+            ]:
+                continue
+            yield row[0].strip(), row[1].strip()
+
+
+def resolve(value, policy=None, max_distance=0):
+    """
+    Return the person_id for `value`, which may be an id or a name.
+
+    Names shared by several people are resolved with `policy`, one of
+    `degrees.POLICIES`. If no name matches exactly and `max_distance` is
+    positive, the closest names within that many edits are used instead.
+    Return None if the value matches nobody, or more than one person
+    and there is no policy.
+    """
+    if value in degrees.people:
+        return value
+    person_ids = degrees.names.get(value.lower(), set())
+    if not person_ids and max_distance > 0:
+        matches = degrees.names.fuzzy(value.lower(), max_distance)
+        for distance, name in matches:
+            if distance > matches[0][0]:
+                break
+            person_ids = person_ids | degrees.names[name]
+    if len(person_ids) == 1:
+        return next(iter(person_ids))
+    if person_ids and policy is not None:
+        return degrees.choose_person(person_ids, policy)
+    return None
+
+
+def solve(source_id, queries):
+    """
+    Answer every query sharing `source_id` with a single breadth-first
+    search from it. `queries` is a list of (number, source, target,
+    target_id) tuples. Return a list of result dicts.
+    """
+    graph = degrees.graph
+    source = graph.person_index[source_id]
+    by_target = {}
+    for query in queries:
+        target = graph.person_index[query[3]]
+        by_target.setdefault(target, []).append(query)
+
+    results = []
+    start = time.perf_counter()
+    for target, path in graph.paths_from(source, by_target):
+        elapsed = time.perf_counter() - start
+        if path is not None:
+            path = [
+                [graph.movie_ids[movie], graph.person_ids[person]]
+                for movie, person in path
+            ]
+        for number, source_name, target_name, target_id in by_target[target]:
+            results.append({
+                "query": number,
+                "source": source_name,
+                "target": target_name,
+                "source_id": source_id,
+                "target_id": target_id,
+                "degrees": None if path is None else len(path),
+                "path": path,
+                "ms": round(elapsed * 1000, 3),
+            })
+    return results
+
+
+def solve_group(group):
+    """Unpack a (source_id, queries) group for `Pool.imap_unordered`."""
+    return solve(*group)
+
+
+def init_worker(directory, cache):
+    """Load the graph in a worker process that was not forked."""
+    if degrees.graph is None:
+        degrees.load_data(directory, compact=True, cache=cache)
+
+
+def run(filename, directory, workers=1, cache=False, policy=None,
+        max_distance=0, output=sys.stdout):
+    """
+    Answer every query in `filename` against the data in `directory`,
+    writing one JSON line per query to `output` as results arrive.
+    Names are resolved as in `resolve`.
+    """
+    degrees.load_data(directory, compact=True, cache=cache)
+
+    # Group resolved queries by source so each source is searched once
+    groups = {}
+    for number, (source, target) in enumerate(read_queries(filename)):
+        source_id = resolve(source, policy, max_distance)
+        target_id = resolve(target, policy, max_distance)
+        if source_id is None or target_id is None:
+            missing = source if source_id is None else target
+            output.write(json.dumps({
+                "query": number,
+                "source": source,
+                "target": target,
+                "error": f"Person not found or ambiguous: {missing}",
+            }) + "\n")
+            continue
+        groups.setdefault(source_id, []).append(
+            (number, source, target, target_id)
+        )
+
+    if workers == 1:
+        for group in map(solve_group, groups.items()):
+            for result in group:
+                output.write(json.dumps(result) + "\n")
+            output.flush()
+        return
+
+    # Forked workers share the already-loaded graph copy-on-write;
+    # elsewhere each worker loads it itself, ideally from the snapshot
+    methods = multiprocessing.get_all_start_methods()
+    if "fork" in methods:
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    with context.Pool(
+        workers, initializer=init_worker, initargs=(directory, cache)
+    ) as pool:
+        for group in pool.imap_unordered(solve_group, groups.items()):
+            for result in group:
+                output.write(json.dumps(result) + "\n")
+            output.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer degrees of separation queries from a file."
+    )
+    parser.add_argument("queries", help="CSV file of source,target pairs")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(),
+        help="number of worker processes (default: one per CPU)"
+    )
+    parser.add_argument(
+        "--cache", action="store_true",
+        help="load the graph from a binary snapshot"
+    )
+    parser.add_argument(
+        "--policy", choices=degrees.POLICIES,
+        help="how to choose between people who share a name"
+    )
+    parser.add_argument(
+        "--max-distance", type=int, default=0,
+        help="match names within this many edits if none match exactly"
+    )
+    args = parser.parse_args()
+    run(
+        args.queries, args.directory, workers=args.workers,
+        cache=args.cache, policy=args.policy, max_distance=args.max_distance
+    )
+
+
+if __name__ == "__main__":
+    main()
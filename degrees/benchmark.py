@@ -0,0 +1,376 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import degrees
+import synthetic
+from landmarks import LandmarkIndex
+
+QUERIES = 200
+
+# (name, compact, cache, bidirectional) for each mode `run_suite` measures;
+# "snapshot-write" runs first and writes the snapshot the others map
+SUITE = [
+    ("dict", False, False, False),
+    ("dict-bidi", False, False, True),
+    ("compact", True, False, False),
+    ("compact-bidi", True, False, True),
+    ("snapshot-write", False, True, False),
+    ("snapshot", False, True, False),
+    ("snapshot-bidi", False, True, True),
+]
+
+
+def reset():
+    """Clear any data loaded into the `degrees` module."""
+    degrees.names = {}
+    degrees.people = {}
+    degrees.movies = {}
+    degrees.graph = None
+    degrees.oracle = None
+    degrees.path_cache = None
+    for counter in degrees.update_stats:
+        degrees.update_stats[counter] = 0
+
+
+# Run in a fresh interpreter so that load time and peak RSS cover only
+# one load; prints a JSON object of measurements
+MEASURE = """
+import json, resource, sys, time
+import benchmark, degrees
+directory, compact, cache, bidirectional, queries = sys.argv[1:]
+start = time.perf_counter()
+degrees.load_data(directory, compact=compact == "1", cache=cache == "1")
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+with open(queries) as f:
+    pairs = json.load(f)
+latencies, explored = benchmark.query(pairs, bidirectional == "1")
+print(json.dumps({
+    "load_seconds": elapsed,
+    "load_rss_kb": rss,
+    "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "latencies": latencies,
+    "explored": explored,
+}))
+"""
+
+
+def measure(directory, compact, cache, bidirectional=False, pairs=()):
+    """
+    Load `directory` in a new process and run `shortest_path` over
+    `pairs` there. Return the dict of measurements it prints.
+    """
+    with tempfile.NamedTemporaryFile("w", suffix=".json") as f:
+        json.dump(list(pairs), f)
+        f.flush()
+        output = subprocess.run(
+            [sys.executable, "-c", MEASURE, directory, str(int(compact)),
+             str(int(cache)), str(int(bidirectional)), f.name],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output)
+
+
+def query(pairs, bidirectional):
+    """
+    Run `shortest_path` over each pair.
+    Return a list of per-query latencies in seconds and a list of
+    the number of nodes each query expanded.
+    """
+    latencies = []
+    explored = []
+    for source, target in pairs:
+        start = time.perf_counter()
+        try:
+            degrees.shortest_path(source, target, bidirectional=bidirectional)
+        except Exception:
+            # The dict search raises when two people are not connected
+            pass
+        latencies.append(time.perf_counter() - start)
+        explored.append(degrees.num_explored)
+    return latencies, explored
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def compare_landmarks(directory, sizes=(1, 2, 4, 8, 16)):
+    """
+    Print build time, index size and query speedups of landmark indexes
+    with each number of landmarks in `sizes`, against plain BFS.
+    """
+    reset()
+    degrees.load_data(directory, compact=True)
+    graph = degrees.graph
+    rng = random.Random("queries")
+    n = len(graph.person_ids)
+    pairs = [(rng.randrange(n), rng.randrange(n)) for _ in range(QUERIES)]
+
+    start = time.perf_counter()
+    baseline = [graph.shortest_path(s, t) for s, t in pairs]
+    bfs = (time.perf_counter() - start) / QUERIES
+
+    print(f"{'k':>3} {'build (s)':>10} {'size (MB)':>10} {'exact':>6} "
+          f"{'degrees x':>10} {'path x':>7} {'expanded':>9}")
+    for k in sizes:
+        start = time.perf_counter()
+        oracle = LandmarkIndex.build(graph, k)
+        build = time.perf_counter() - start
+
+        # Queries answered exactly from the bounds alone
+        exact = sum(
+            oracle.bounds(s, t)[0] == oracle.bounds(s, t)[1] for s, t in pairs
+        )
+        start = time.perf_counter()
+        answers = [oracle.degrees(s, t) for s, t in pairs]
+        distance = (time.perf_counter() - start) / QUERIES
+        assert answers == [
+            None if path is None else len(path) for path in baseline
+        ]
+
+        explored = 0
+        start = time.perf_counter()
+        for (s, t), expected in zip(pairs, baseline):
+            path = oracle.shortest_path(s, t)
+            explored += oracle.num_explored
+            assert (path is None) == (expected is None)
+            assert path is None or len(path) == len(expected)
+        search = (time.perf_counter() - start) / QUERIES
+
+        print(f"{k:>3} {build:>10.3f} {oracle.nbytes() / 2 ** 20:>10.2f} "
+              f"{exact / QUERIES:>6.0%} {bfs / distance:>10.1f} "
+              f"{bfs / search:>7.1f} {explored / QUERIES:>9.1f}")
+    print()
+
+
+def compare_names(directory, seconds=1.0):
+    """
+    Print lookups per second of exact, prefix and fuzzy name resolution,
+    using names from `directory` with one character changed for fuzzy.
+    """
+    reset()
+    degrees.load_data(directory, compact=True)
+    index = degrees.names
+    rng = random.Random("names")
+    sample = [rng.choice(index.names) for _ in range(QUERIES)]
+    typos = []
+    for name in sample:
+        k = rng.randrange(len(name))
+        typos.append(name[:k] + rng.choice("abcdefghij") + name[k + 1:])
+
+    # Build the n-gram postings up front so they are not timed
+    start = time.perf_counter()
+    index.fuzzy(sample[0], 1)
+    print(f"n-gram postings built in {time.perf_counter() - start:.3f}s")
+
+    print(f"{'lookup':<8} {'per second':>12}")
+    for kind, lookup, queries in (
+        ("exact", index.get, sample),
+        ("prefix", lambda name: index.prefix(name[:4], 10), sample),
+        ("fuzzy", lambda name: index.fuzzy(name, 1, 10), typos),
+    ):
+        count = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            lookup(queries[count % len(queries)])
+            count += 1
+        print(f"{kind:<8} {count / (time.perf_counter() - start):>12.0f}")
+    print()
+
+
+def compare_updates(directory, rounds=5, batch=100):
+    """
+    Print path cache hit rates over popular, Zipf-distributed query pairs
+    and the throughput of incremental star additions between rounds.
+    """
+    reset()
+    degrees.load_data(directory, compact=True)
+    degrees.enable_path_cache(QUERIES * 10)
+    person_ids = list(degrees.people)
+    movie_ids = list(degrees.movies)
+    rng = random.Random("updates")
+    popular = [
+        (rng.choice(person_ids), rng.choice(person_ids))
+        for _ in range(QUERIES)
+    ]
+    weights = [1 / (k + 1) for k in range(len(popular))]
+
+    print(f"{'round':>5} {'hit rate':>9} {'query (ms)':>11} "
+          f"{'updates/s':>10} {'invalidated':>12}")
+    for round in range(rounds):
+        hits, misses = degrees.path_cache.hits, degrees.path_cache.misses
+        start = time.perf_counter()
+        for source, target in rng.choices(popular, weights, k=QUERIES):
+            degrees.shortest_path(source, target, bidirectional=True)
+        elapsed = (time.perf_counter() - start) / QUERIES
+        hits = degrees.path_cache.hits - hits
+        misses = degrees.path_cache.misses - misses
+
+        invalidated = degrees.update_stats["invalidated"]
+        start = time.perf_counter()
+        degrees.add_stars(
+            (rng.choice(person_ids), rng.choice(movie_ids))
+            for _ in range(batch)
+        )
+        throughput = batch / (time.perf_counter() - start)
+        invalidated = degrees.update_stats["invalidated"] - invalidated
+        print(f"{round:>5} {hits / (hits + misses):>9.0%} "
+              f"{elapsed * 1000:>11.3f} {throughput:>10.0f} "
+              f"{invalidated:>12}")
+    print()
+
+
+def sample_pairs(directory, count, seed="queries"):
+    """Return `count` random (source, target) person_id pairs."""
+    with open(os.path.join(directory, "people.csv"), encoding="utf-8") as f:
+        person_ids = [row["id"] for row in csv.DictReader(f)]
+    rng = random.Random(seed)
+    return [
+        (rng.choice(person_ids), rng.choice(person_ids))
+        for _ in range(count)
+    ]
+
+
+def summarize(values, scale=1):
+    """Return percentiles and the mean of `values`, multiplied by `scale`."""
+    return {
+        "p50": percentile(values, 50) * scale,
+        "p90": percentile(values, 90) * scale,
+        "p99": percentile(values, 99) * scale,
+        "max": max(values) * scale,
+        "mean": sum(values) / len(values) * scale,
+    }
+
+
+def run_suite(directory, queries=QUERIES, modes=None):
+    """
+    Measure every search mode over `directory`, each in a fresh process.
+    Return a JSON-serializable dict of load time, peak RSS, query latency
+    percentiles and nodes expanded per mode.
+    """
+    pairs = sample_pairs(directory, queries)
+    sizes = {}
+    for filename in ("people.csv", "movies.csv", "stars.csv"):
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            sizes[filename] = sum(1 for _ in f) - 1
+
+    # Start from a cold snapshot so its first load writes it, keeping any
+    # snapshot already in the directory aside to put back afterwards
+    path = os.path.join(directory, degrees.SNAPSHOT)
+    results = {}
+    with tempfile.TemporaryDirectory() as temp:
+        saved = os.path.join(temp, degrees.SNAPSHOT)
+        if os.path.exists(path):
+            shutil.move(path, saved)
+        try:
+            for mode, compact, cache, bidirectional in SUITE:
+                if modes is not None and mode not in modes:
+                    continue
+                result = measure(
+                    directory, compact, cache, bidirectional, pairs
+                )
+                results[mode] = {
+                    "load_seconds": result["load_seconds"],
+                    "load_rss_mb": result["load_rss_kb"] / 1024,
+                    "peak_rss_mb": result["peak_rss_kb"] / 1024,
+                    "latency_ms": summarize(result["latencies"], 1000),
+                    "explored": summarize(result["explored"]),
+                }
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+            if os.path.exists(saved):
+                shutil.move(saved, path)
+
+    return {
+        "directory": directory,
+        "rows": sizes,
+        "queries": queries,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "modes": results,
+    }
+
+
+def print_suite(report):
+    """Print the results of `run_suite` as a table."""
+    rows = report["rows"]
+    print(f"{report['directory']}: {rows['people.csv']} people, "
+          f"{rows['movies.csv']} movies, {rows['stars.csv']} stars")
+    print(f"{'mode':<15} {'load (s)':>9} {'RSS (MB)':>9} {'p50 (ms)':>9} "
+          f"{'p99 (ms)':>9} {'expanded':>9}")
+    for mode, result in report["modes"].items():
+        print(f"{mode:<15} {result['load_seconds']:>9.3f} "
+              f"{result['peak_rss_mb']:>9.1f} "
+              f"{result['latency_ms']['p50']:>9.3f} "
+              f"{result['latency_ms']['p99']:>9.3f} "
+              f"{result['explored']['mean']:>9.1f}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark loading and searching degrees data."
+    )
+    parser.add_argument(
+        "directory", nargs="?",
+        help="dataset to benchmark (default: small and a synthetic set)"
+    )
+    parser.add_argument(
+        "--synthetic", type=int, metavar="STARS",
+        help="generate a synthetic dataset with about this many star rows"
+    )
+    parser.add_argument("--queries", type=int, default=QUERIES)
+    parser.add_argument(
+        "--modes", nargs="+", choices=[mode[0] for mode in SUITE],
+        help="search modes to measure (default: all)"
+    )
+    parser.add_argument(
+        "--json", metavar="FILE", help="write the results as JSON to FILE"
+    )
+    parser.add_argument(
+        "--all", action="store_true",
+        help="also compare landmarks, name lookups and updates"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp:
+        if args.directory and args.synthetic:
+            directories = [args.directory]
+            synthetic.generate(args.directory, args.synthetic)
+        elif args.directory:
+            directories = [args.directory]
+        else:
+            directories = ["small", temp]
+            synthetic.generate(temp, args.synthetic or 100000)
+
+        reports = []
+        for directory in directories:
+            report = run_suite(directory, args.queries, args.modes)
+            print_suite(report)
+            reports.append(report)
+            if args.all:
+                compare_landmarks(directory)
+                compare_names(directory)
+                compare_updates(directory)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
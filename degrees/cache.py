@@ -0,0 +1,91 @@
+import collections
+
+
+class PathCache():
+    """
+    Bounded least-recently-used cache of shortest path results, keyed on
+    (source, target) person_ids. Also counts hits, misses and evictions.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.paths = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.paths)
+
+    def get(self, source, target):
+        """
+        Return (True, path) if a result for the pair is cached, where path
+        may be None for unconnected people, or (False, None) otherwise.
+        """
+        key = (source, target)
+        if key not in self.paths:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self.paths.move_to_end(key)
+        path = self.paths[key]
+        return True, None if path is None else list(path)
+
+    def put(self, source, target, path):
+        """Cache `path` for the pair, evicting the oldest if full."""
+        self.paths[source, target] = None if path is None else tuple(path)
+        self.paths.move_to_end((source, target))
+        while len(self.paths) > self.size:
+            self.paths.popitem(last=False)
+            self.evictions += 1
+
+    def max_length(self):
+        """Return the length of the longest cached path."""
+        return max(
+            (len(path) for path in self.paths.values() if path is not None),
+            default=0
+        )
+
+    def invalidate(self, near_people, near_stars):
+        """
+        Drop every result an added edge could improve on.
+
+        `near_people` and `near_stars` map person_ids to their distance
+        from the nearest person given a new movie, and from the nearest
+        star of a movie that gained a star, respectively, for everyone
+        within `max_length() - 2` of them. A cached path of length L can
+        only get shorter through a new edge if
+        d(source, person) + 1 + d(star, target) < L, or the same with the
+        ends swapped, which anyone further away cannot satisfy.
+        Unconnected results are always dropped.
+        """
+        stale = []
+        for (source, target), path in self.paths.items():
+            if path is None:
+                stale.append((source, target))
+                continue
+            shortcut = min(
+                near_people.get(source, len(path))
+                + 1 + near_stars.get(target, len(path)),
+                near_stars.get(source, len(path))
+                + 1 + near_people.get(target, len(path))
+            )
+            if shortcut < len(path):
+                stale.append((source, target))
+        for key in stale:
+            del self.paths[key]
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def stats(self):
+        """Return hit rate and counters as a dict."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.paths),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -1,9 +1,19 @@
 import csv
+import heapq
+import math
+import os
 import sys
+import time
 
+import snapshot
+from cache import PathCache
+from graph import CompactGraph, PeopleView, MoviesView, walk_back
+from landmarks import LandmarkIndex
+from nameindex import NameIndex
 from util import Node, StackFrontier, QueueFrontier
 
-# Maps names to a set of corresponding person_ids
+# Maps names to a set of corresponding person_ids, as a `NameIndex`
+# that also answers prefix and fuzzy lookups once data is loaded
 names = {}
 
 # Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
@@ -12,11 +22,58 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Integer-indexed CSR co-star graph, set when loaded with `compact=True`
+graph = None
 
-def load_data(directory):
+# Landmark distance oracle over `graph`, set by `load_landmarks`
+oracle = None
+
+# Filenames of the binary snapshot and landmark index written inside
+# the data directory, and the default number of landmarks
+SNAPSHOT = "degrees.snapshot"
+LANDMARKS = "degrees.landmarks"
+NUM_LANDMARKS = 16
+
+# Number of nodes expanded by the most recent search
+num_explored = 0
+
+# LRU cache of shortest_path results, set by `enable_path_cache`
+path_cache = None
+
+# Counters for incremental updates made by `add_stars`
+update_stats = {"added": 0, "skipped": 0, "invalidated": 0, "seconds": 0.0}
+
+# Non-interactive ways to choose between people who share a name:
+# the person in the most movies, or the one born earliest
+POLICIES = ["movies", "birth"]
+
+
+def load_data(directory, compact=False, cache=False):
     """
     Load data from CSV files into memory.
+
+    If `compact` is True, build a `CompactGraph` instead of dicts of sets;
+    `people` and `movies` then become read-only views over it.
+
+    If `cache` is True, load a compact graph from a binary snapshot of the
+    CSV files, writing the snapshot first if it is missing or stale.
     """
+    global graph, names, people, movies
+    if cache:
+        path = os.path.join(directory, SNAPSHOT)
+        if not snapshot.is_fresh(path, directory):
+            snapshot.write(path, CompactGraph.from_csv(directory), directory)
+        graph, names = snapshot.load(path)
+        people = PeopleView(graph)
+        movies = MoviesView(graph)
+        return
+    if compact:
+        graph = CompactGraph.from_csv(directory)
+        people = PeopleView(graph)
+        movies = MoviesView(graph)
+        names = NameIndex.build(graph.person_ids, graph.person_names)
+        return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -26,10 +83,6 @@ def load_data(directory):
                 "birth": row["birth"],
                 "movies": set()
             }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
 
     # Load movies
     with open(f"{directory}/movies.csv", encoding="utf-8") as f:
@@ -51,15 +104,50 @@ def load_data(directory):
             except KeyError:
                 pass
 
+    # Index names for exact, prefix and fuzzy lookups
+    person_ids = list(people)
+    names = NameIndex.build(
+        person_ids, [people[person_id]["name"] for person_id in person_ids]
+    )
+
+
+def load_landmarks(directory, k=NUM_LANDMARKS):
+    """
+    Load the landmark index for the compact graph loaded from `directory`,
+    building and saving it first if it is missing, stale or was built
+    with a different number of landmarks.
+    """
+    global oracle
+    path = os.path.join(directory, LANDMARKS)
+    sources = snapshot.source_stats(directory)
+    oracle = LandmarkIndex.load(graph, path, sources)
+    if oracle is None or len(oracle.landmarks) != k:
+        oracle = LandmarkIndex.build(graph, k)
+        oracle.save(path, sources)
+
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    flags = {
+        "--compact", "--bidirectional", "--cache", "--landmarks", "--all"
+    }
+    use_landmarks = "--landmarks" in sys.argv
+    compact = "--compact" in sys.argv or use_landmarks
+    cache = "--cache" in sys.argv
+    bidirectional = "--bidirectional" in sys.argv
+    show_all = "--all" in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg not in flags]
+    if len(args) > 1:
+        sys.exit(
+            "Usage: python degrees.py [--compact] [--cache] "
+            "[--landmarks] [--bidirectional] [--all] [directory]"
+        )
+    directory = args[0] if len(args) == 1 else "large"
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(directory, compact=compact, cache=cache)
+    if use_landmarks:
+        load_landmarks(directory)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -69,23 +157,84 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    if show_all:
+        count = 0
+        for path in all_shortest_paths(source, target):
+            count += 1
+            print(f"Path {count}:")
+            print_path(source, path)
+        if count == 0:
+            print("Not connected.")
+        return
+
+    path = shortest_path(source, target, bidirectional=bidirectional)
 
     if path is None:
         print("Not connected.")
     else:
-        degrees = len(path)
-        print(f"{degrees} degrees of separation.")
-        path = [(None, source)] + path
-        for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
-            print(f"{i + 1}: {person1} and {person2} starred in {movie}")
+        print_path(source, path)
+
+
+def print_path(source, path):
+    """Print the degrees of separation and each step of `path`."""
+    degrees = len(path)
+    print(f"{degrees} degrees of separation.")
+    path = [(None, source)] + path
+    for i in range(degrees):
+        person1 = people[path[i][1]]["name"]
+        person2 = people[path[i + 1][1]]["name"]
+        movie = movies[path[i + 1][0]]["title"]
+        print(f"{i + 1}: {person1} and {person2} starred in {movie}")
+
+
+def shortest_path(source, target, bidirectional=False):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, using `path_cache`
+    if it is enabled.
 
+    If no possible path, returns None.
+    """
+    if path_cache is None:
+        return find_path(source, target, bidirectional)
+    hit, path = path_cache.get(source, target)
+    if not hit:
+        path = find_path(source, target, bidirectional)
+        path_cache.put(source, target, path)
+    return path
+
+
+def find_path(source, target, bidirectional=False):
+    """
+    Finds a solution to maze, if one exists.
+
+    If `bidirectional` is True, search from both ends at once and
+    meet in the middle.
+    """
+    global num_explored
 
-def shortest_path(source, target):
-    """Finds a solution to maze, if one exists."""
+    # Search the compact graph directly if one is loaded
+    if graph is not None:
+        source = graph.person_index[source]
+        target = graph.person_index[target]
+        if bidirectional:
+            path = graph.bidirectional_path(source, target)
+            num_explored = graph.num_explored
+        elif oracle is not None:
+            path = oracle.shortest_path(source, target)
+            num_explored = oracle.num_explored
+        else:
+            path = graph.shortest_path(source, target)
+            num_explored = graph.num_explored
+        if path is None:
+            return None
+        return [
+            (graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path
+        ]
+
+    if bidirectional:
+        return bidirectional_path(source, target)
 
     # Keep track of number of states explored
     num_explored = 0
@@ -121,7 +270,6 @@ def shortest_path(source, target):
                         connections.append(node.state)
                         node = node.parent
                     connections.reverse()
-                    #print(f"Number of Nodes Explored: {num_explored}")
                     return connections
                 frontier.add(child)
 
@@ -129,15 +277,154 @@ def shortest_path(source, target):
         explored.add(node.state)
 
 
-def person_id_for_name(name):
+def bidirectional_path(source, target):
+    """
+    Breadth-first search outwards from both `source` and `target`,
+    always expanding the smaller frontier by one full layer.
+
+    Returns the same list of (movie_id, person_id) pairs as
+    `shortest_path`, or None if the two people are not connected.
+    """
+    global num_explored
+    num_explored = 0
+    if source == target:
+        return []
+
+    # Each side maps every person it has reached to the
+    # (movie_id, person_id) it was reached from
+    visited = ({source: None}, {target: None})
+    frontiers = (QueueFrontier(), QueueFrontier())
+    frontiers[0].add(Node(state=source, parent=None))
+    frontiers[1].add(Node(state=target, parent=None))
+
+    while not frontiers[0].empty() and not frontiers[1].empty():
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        frontier, seen, other = frontiers[side], visited[side], visited[1 - side]
+
+        # Expand one whole layer, collecting every person where the
+        # two searches meet, so the shortest meeting point can be chosen
+        meetings = []
+        for _ in range(len(frontier)):
+            node = frontier.remove()
+            num_explored += 1
+            for movie_id, person_id in neighbors_for_person(node.state):
+                if person_id in seen:
+                    continue
+                seen[person_id] = (movie_id, node.state)
+                if person_id in other:
+                    meetings.append(person_id)
+                frontier.add(Node(state=person_id, parent=node))
+
+        if meetings:
+            paths = [join_paths(visited, person_id) for person_id in meetings]
+            return min(paths, key=len)
+
+    return None
+
+
+def join_paths(visited, person_id):
+    """
+    Given the forward and backward `visited` maps of a bidirectional
+    search, return the path from source to target through `person_id`.
+    """
+    forward, backward = visited
+    path = []
+    person = person_id
+    while forward[person] is not None:
+        movie_id, parent = forward[person]
+        path.append((movie_id, person))
+        person = parent
+    path.reverse()
+    person = person_id
+    while backward[person] is not None:
+        movie_id, child = backward[person]
+        path.append((movie_id, child))
+        person = child
+    return path
+
+
+def all_shortest_paths(source, target, limit=None):
+    """
+    Lazily yields every distinct shortest list of (movie_id, person_id)
+    pairs that connects the source to the target, up to `limit` of them,
+    from a single breadth-first search that keeps every predecessor.
+
+    If no possible path, yields nothing.
+    """
+    global num_explored
+
+    if graph is not None:
+        paths = graph.all_shortest_paths(
+            graph.person_index[source], graph.person_index[target], limit
+        )
+        for path in paths:
+            num_explored = graph.num_explored
+            yield [
+                (graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in path
+            ]
+        return
+
+    num_explored = 0
+    if source == target:
+        yield []
+        return
+
+    # Each reached person maps to the movies it was first reached through,
+    # and each of those movies to the people a layer closer who were in it
+    reached_by = {source: []}
+    cast_from = {}
+    layer = [source]
+    while layer and target not in reached_by:
+        layer_movies = {}
+        for person_id in layer:
+            num_explored += 1
+            for movie_id in people[person_id]["movies"]:
+                if movie_id not in cast_from:
+                    layer_movies.setdefault(movie_id, []).append(person_id)
+        next_layer = {}
+        for movie_id, person_ids in layer_movies.items():
+            cast_from[movie_id] = person_ids
+            for person_id in movies[movie_id]["stars"]:
+                if person_id in next_layer:
+                    next_layer[person_id].append(movie_id)
+                elif person_id not in reached_by:
+                    next_layer[person_id] = [movie_id]
+        reached_by.update(next_layer)
+        layer = list(next_layer)
+    if target in reached_by:
+        yield from walk_back(reached_by, cast_from, source, target, limit)
+
+
+def newest_paths(source, target, k):
+    """
+    Returns up to `k` of the shortest paths from source to target, most
+    recent first: paths are ranked by the year of their oldest movie,
+    then their next oldest, and so on.
+    """
+    def years(path):
+        return sorted(
+            int(year) if year.isdigit() else 0
+            for year in (movies[movie_id]["year"] for movie_id, _ in path)
+        )
+
+    return heapq.nlargest(k, all_shortest_paths(source, target), key=years)
+
+
+def person_id_for_name(name, policy=None):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    If `policy` is one of `POLICIES`, ambiguities are resolved
+    with it instead of asking which person was intended.
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
+        if policy is not None:
+            return choose_person(person_ids, policy)
         print(f"Which '{name}'?")
         for person_id in person_ids:
             person = people[person_id]
@@ -155,11 +442,144 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def choose_person(person_ids, policy):
+    """
+    Choose one of `person_ids` according to `policy`: "movies" picks
+    the person in the most movies, "birth" the one born earliest.
+    Remaining ties go to the smallest ID.
+    """
+    person_ids = sorted(person_ids)
+    if policy == "movies":
+        return max(person_ids, key=lambda p: len(people[p]["movies"]))
+    elif policy == "birth":
+        def birth(person_id):
+            year = people[person_id]["birth"]
+            return int(year) if year.isdigit() else math.inf
+        return min(person_ids, key=birth)
+    raise ValueError(f"unknown policy: {policy}")
+
+
+def enable_path_cache(size=10000):
+    """Cache up to `size` results of `shortest_path`."""
+    global path_cache
+    path_cache = PathCache(size)
+
+
+def add_person(person_id, name, birth):
+    """
+    Add a new person to the loaded data. The landmark index, which has
+    no distances for them, is dropped.
+    """
+    global oracle
+    oracle = None
+    if graph is not None:
+        graph.add_person(person_id, name, birth)
+    else:
+        people[person_id] = {"name": name, "birth": birth, "movies": set()}
+    names.add(person_id, name)
+
+
+def add_movie(movie_id, title, year):
+    """
+    Add a new movie to the loaded data. The landmark index, which was
+    built without it, is dropped.
+    """
+    global oracle
+    oracle = None
+    if graph is not None:
+        graph.add_movie(movie_id, title, year)
+    else:
+        movies[movie_id] = {"title": title, "year": year, "stars": set()}
+
+
+def add_stars(stars):
+    """
+    Add (person_id, movie_id) pairs, such as rows appended to stars.csv,
+    to the loaded data. Pairs naming an unknown person or movie, or that
+    are already known, are skipped.
+
+    Cached paths that the new edges could shorten are invalidated, and
+    the landmark index, whose bounds no longer hold, is dropped.
+    Return the number of pairs added.
+    """
+    global oracle
+    start = time.perf_counter()
+    count = 0
+    added_people = set()
+    added_movies = set()
+    for person_id, movie_id in stars:
+        if person_id not in people or movie_id not in movies:
+            update_stats["skipped"] += 1
+            continue
+        if graph is not None:
+            added = graph.add_star(
+                graph.person_index[person_id], graph.movie_index[movie_id]
+            )
+        else:
+            added = movie_id not in people[person_id]["movies"]
+            people[person_id]["movies"].add(movie_id)
+            movies[movie_id]["stars"].add(person_id)
+        if not added:
+            update_stats["skipped"] += 1
+            continue
+        count += 1
+        added_people.add(person_id)
+        added_movies.add(movie_id)
+    update_stats["added"] += count
+
+    if added_people:
+        oracle = None
+        if path_cache is not None:
+            radius = path_cache.max_length() - 2
+            stars_of = set()
+            for movie_id in added_movies:
+                stars_of |= movies[movie_id]["stars"]
+            update_stats["invalidated"] += path_cache.invalidate(
+                distances_within(added_people, radius),
+                distances_within(stars_of, radius)
+            )
+    update_stats["seconds"] += time.perf_counter() - start
+    return count
+
+
+def distances_within(sources, radius):
+    """
+    Return a dict mapping every person_id within `radius` of the nearest
+    person in `sources` to that distance.
+    """
+    if radius < 0:
+        return {}
+    if graph is not None:
+        distances = graph.distances_within(
+            [graph.person_index[person_id] for person_id in sources], radius
+        )
+        return {
+            graph.person_ids[person]: distance
+            for person, distance in distances.items()
+        }
+    distances = {person_id: 0 for person_id in sources}
+    layer = list(distances)
+    for depth in range(1, radius + 1):
+        next_layer = []
+        for person_id in layer:
+            for _, neighbor in neighbors_for_person(person_id):
+                if neighbor not in distances:
+                    distances[neighbor] = depth
+                    next_layer.append(neighbor)
+        layer = next_layer
+    return distances
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return {
+            (graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in graph.neighbors(graph.person_index[person_id])
+        }
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
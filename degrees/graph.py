@@ -0,0 +1,505 @@
+import csv
+from array import array
+from collections.abc import Mapping
+
+
+class CompactGraph():
+    """
+    Co-star graph with person and movie IDs interned to dense integers.
+
+    Adjacency is stored in CSR form: `person_offsets[p]` to
+    `person_offsets[p + 1]` is the slice of `person_movies` holding the
+    movies person `p` starred in, and likewise `movie_offsets` and
+    `movie_people` hold the stars of each movie. Stars added after
+    loading are kept in `extra_movies` and `extra_stars` until the
+    graph is rebuilt.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies,
+                 movie_offsets, movie_people,
+                 person_index=None, movie_index=None):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+
+        # Indexes from ID strings to dense ints, built unless supplied
+        if person_index is None:
+            person_index = {
+                person_id: i for i, person_id in enumerate(person_ids)
+            }
+        if movie_index is None:
+            movie_index = {
+                movie_id: i for i, movie_id in enumerate(movie_ids)
+            }
+        self.person_index = person_index
+        self.movie_index = movie_index
+
+        # Edges added since the CSR arrays were built, by person and movie
+        self.extra_movies = {}
+        self.extra_stars = {}
+
+        # Number of people expanded by the most recent search
+        self.num_explored = 0
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Load people, movies and stars CSV files straight into a compact
+        graph, without building the intermediate dicts of sets.
+        """
+        person_ids, person_names, person_births = [], [], []
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                person_ids.append(row["id"])
+                person_names.append(row["name"])
+                person_births.append(row["birth"])
+
+        movie_ids, movie_titles, movie_years = [], [], []
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                movie_ids.append(row["id"])
+                movie_titles.append(row["title"])
+                movie_years.append(row["year"])
+
+        person_index = {pid: i for i, pid in enumerate(person_ids)}
+        movie_index = {mid: i for i, mid in enumerate(movie_ids)}
+        edges = set()
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                person = person_index.get(row["person_id"])
+                movie = movie_index.get(row["movie_id"])
+                if person is not None and movie is not None:
+                    edges.add(person * len(movie_ids) + movie)
+
+        return cls(
+            person_ids, person_names, person_births,
+            movie_ids, movie_titles, movie_years,
+            *build_csr(edges, len(person_ids), len(movie_ids))
+        )
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """
+        Build a compact graph from `people` and `movies` dicts in the
+        format produced by `degrees.load_data`.
+        """
+        person_ids = list(people)
+        movie_ids = list(movies)
+        movie_index = {mid: i for i, mid in enumerate(movie_ids)}
+        edges = set()
+        for person, person_id in enumerate(person_ids):
+            for movie_id in people[person_id]["movies"]:
+                edges.add(person * len(movie_ids) + movie_index[movie_id])
+        return cls(
+            person_ids,
+            [people[p]["name"] for p in person_ids],
+            [people[p]["birth"] for p in person_ids],
+            movie_ids,
+            [movies[m]["title"] for m in movie_ids],
+            [movies[m]["year"] for m in movie_ids],
+            *build_csr(edges, len(person_ids), len(movie_ids))
+        )
+
+    def movies_for(self, person):
+        """Return the movie indices person `person` starred in."""
+        offsets = self.person_offsets
+        movies = self.person_movies[offsets[person]:offsets[person + 1]]
+        extra = self.extra_movies.get(person)
+        return movies if extra is None else [*movies, *extra]
+
+    def stars_for(self, movie):
+        """Return the person indices who starred in movie `movie`."""
+        offsets = self.movie_offsets
+        stars = self.movie_people[offsets[movie]:offsets[movie + 1]]
+        extra = self.extra_stars.get(movie)
+        return stars if extra is None else [*stars, *extra]
+
+    def _make_writable(self):
+        """
+        Copy any read-only tables, such as those memory-mapped from a
+        snapshot, so that people and movies can be appended.
+        """
+        if isinstance(self.person_ids, list):
+            return
+        for column in ("person_ids", "person_names", "person_births",
+                       "movie_ids", "movie_titles", "movie_years"):
+            setattr(self, column, list(getattr(self, column)))
+        self.person_offsets = array("q", self.person_offsets)
+        self.movie_offsets = array("q", self.movie_offsets)
+        self.person_index = {p: i for i, p in enumerate(self.person_ids)}
+        self.movie_index = {m: i for i, m in enumerate(self.movie_ids)}
+
+    def add_person(self, person_id, name, birth):
+        """Add a person with no movies and return their index."""
+        self._make_writable()
+        self.person_index[person_id] = len(self.person_ids)
+        self.person_ids.append(person_id)
+        self.person_names.append(name)
+        self.person_births.append(birth)
+        self.person_offsets.append(self.person_offsets[-1])
+        return self.person_index[person_id]
+
+    def add_movie(self, movie_id, title, year):
+        """Add a movie with no stars and return its index."""
+        self._make_writable()
+        self.movie_index[movie_id] = len(self.movie_ids)
+        self.movie_ids.append(movie_id)
+        self.movie_titles.append(title)
+        self.movie_years.append(year)
+        self.movie_offsets.append(self.movie_offsets[-1])
+        return self.movie_index[movie_id]
+
+    def add_star(self, person, movie):
+        """
+        Record that person index `person` starred in movie index `movie`.
+        Return False if that was already known, otherwise True.
+        """
+        if movie in self.movies_for(person):
+            return False
+        self.extra_movies.setdefault(person, []).append(movie)
+        self.extra_stars.setdefault(movie, []).append(person)
+        return True
+
+    def neighbors(self, person):
+        """
+        Yield (movie, person) index pairs for people who starred
+        with `person`, including `person` itself.
+        """
+        for movie in self.movies_for(person):
+            for star in self.stars_for(movie):
+                yield movie, star
+
+    def shortest_path(self, source, target):
+        """
+        Breadth-first search from person index `source` to `target`.
+
+        Return a list of (movie, person) index pairs leading from
+        `source` to `target`, or None if they are not connected.
+        """
+        for _, path in self.paths_from(source, [target]):
+            return path
+
+    def paths_from(self, source, targets):
+        """
+        Breadth-first search from person index `source` until every
+        person index in `targets` has been reached.
+
+        Yield (target, path) for each target as soon as it is reached,
+        where `path` is a list of (movie, person) index pairs, and then
+        (target, None) for each target not connected to `source`.
+        """
+        self.num_explored = 0
+        remaining = set(targets)
+        if source in remaining:
+            remaining.remove(source)
+            yield source, []
+        if not remaining:
+            return
+        movies_for = self.movies_for
+        stars_for = self.stars_for
+
+        # Each reached person maps to the (movie, person) it was reached from
+        parents = {source: None}
+        seen_movies = set()
+        layer = [source]
+        while layer:
+            next_layer = []
+            for person in layer:
+                self.num_explored += 1
+                for movie in movies_for(person):
+                    # A movie only needs expanding the first time it is seen
+                    if movie in seen_movies:
+                        continue
+                    seen_movies.add(movie)
+                    for star in stars_for(movie):
+                        if star in parents:
+                            continue
+                        parents[star] = (movie, person)
+                        if star in remaining:
+                            remaining.remove(star)
+                            yield star, self._trace(parents, star)
+                            if not remaining:
+                                return
+                        next_layer.append(star)
+            layer = next_layer
+        for target in remaining:
+            yield target, None
+
+    def bidirectional_path(self, source, target):
+        """
+        Breadth-first search outwards from both `source` and `target`,
+        always expanding the smaller frontier by one full layer and
+        stopping at the layer where the two searches meet.
+
+        Return a list of (movie, person) index pairs leading from
+        `source` to `target`, or None if they are not connected.
+        """
+        self.num_explored = 0
+        if source == target:
+            return []
+        movies_for = self.movies_for
+        stars_for = self.stars_for
+
+        parents = ({source: None}, {target: None})
+        seen_movies = (set(), set())
+        layers = ([source], [target])
+        while layers[0] and layers[1]:
+            side = 0 if len(layers[0]) <= len(layers[1]) else 1
+            seen, other = parents[side], parents[1 - side]
+            movies_done = seen_movies[side]
+            meetings = []
+            next_layer = []
+            for person in layers[side]:
+                self.num_explored += 1
+                for movie in movies_for(person):
+                    if movie in movies_done:
+                        continue
+                    movies_done.add(movie)
+                    for star in stars_for(movie):
+                        if star in seen:
+                            continue
+                        seen[star] = (movie, person)
+                        if star in other:
+                            meetings.append(star)
+                        next_layer.append(star)
+            if meetings:
+                paths = [self._join(parents, star) for star in meetings]
+                return min(paths, key=len)
+            layers = (
+                (next_layer, layers[1]) if side == 0
+                else (layers[0], next_layer)
+            )
+        return None
+
+    def _join(self, parents, person):
+        """
+        Return the path from source to target through `person`, given the
+        forward and backward parent maps of a bidirectional search.
+        """
+        path = self._trace(parents[0], person)
+        while parents[1][person] is not None:
+            movie, child = parents[1][person]
+            path.append((movie, child))
+            person = child
+        return path
+
+    def all_shortest_paths(self, source, target, limit=None):
+        """
+        Breadth-first search from person index `source` that records
+        every predecessor of each person in the previous layer, stopping
+        at the layer where `target` is reached.
+
+        Lazily yield each distinct shortest path from `source` to
+        `target` as a list of (movie, person) index pairs, up to `limit`
+        of them. Yield nothing if the two are not connected.
+        """
+        self.num_explored = 0
+        if source == target:
+            yield []
+            return
+        movies_for = self.movies_for
+        stars_for = self.stars_for
+
+        # Each reached person maps to the movies it was first reached
+        # through, and each of those movies to the people in the layer
+        # before who starred in it; together they hold every shortest path
+        reached_by = {source: []}
+        cast_from = {}
+        layer = [source]
+        while layer and target not in reached_by:
+            depth_movies = {}
+            for person in layer:
+                self.num_explored += 1
+                for movie in movies_for(person):
+                    if movie in cast_from:
+                        continue
+                    depth_movies.setdefault(movie, []).append(person)
+            next_layer = {}
+            for movie, parents in depth_movies.items():
+                cast_from[movie] = parents
+                for star in stars_for(movie):
+                    if star in next_layer:
+                        next_layer[star].append(movie)
+                    elif star not in reached_by:
+                        next_layer[star] = [movie]
+            reached_by.update(next_layer)
+            layer = list(next_layer)
+        if target not in reached_by:
+            return
+        yield from walk_back(reached_by, cast_from, source, target, limit)
+
+    def distances_within(self, sources, radius):
+        """
+        Return a dict mapping every person index within `radius` of the
+        nearest person index in `sources` to that distance.
+        """
+        distances = {person: 0 for person in sources}
+        seen_movies = set()
+        layer = list(distances)
+        for depth in range(1, radius + 1):
+            next_layer = []
+            for person in layer:
+                for movie in self.movies_for(person):
+                    if movie in seen_movies:
+                        continue
+                    seen_movies.add(movie)
+                    for star in self.stars_for(movie):
+                        if star not in distances:
+                            distances[star] = depth
+                            next_layer.append(star)
+            layer = next_layer
+        return distances
+
+    def _trace(self, parents, person):
+        """Follow `parents` back from `person` and return the path."""
+        path = []
+        while parents[person] is not None:
+            movie, parent = parents[person]
+            path.append((movie, person))
+            person = parent
+        path.reverse()
+        return path
+
+    def nbytes(self):
+        """Return the size in bytes of the CSR adjacency buffers."""
+        return sum(
+            buffer.itemsize * len(buffer) for buffer in (
+                self.person_offsets, self.person_movies,
+                self.movie_offsets, self.movie_people
+            )
+        )
+
+
+def build_csr(edges, num_people, num_movies):
+    """
+    Given a set of edges packed as `person * num_movies + movie`, return
+    (person_offsets, person_movies, movie_offsets, movie_people) arrays.
+    """
+    person_offsets = array("q", [0]) * (num_people + 1)
+    movie_offsets = array("q", [0]) * (num_movies + 1)
+    person_movies = array("i", [0]) * len(edges)
+    movie_people = array("i", [0]) * len(edges)
+
+    # Sorted packed edges are already grouped by person
+    edges = sorted(edges)
+    for k, edge in enumerate(edges):
+        person, movie = divmod(edge, num_movies)
+        person_movies[k] = movie
+        person_offsets[person + 1] += 1
+        movie_offsets[movie + 1] += 1
+    for i in range(num_people):
+        person_offsets[i + 1] += person_offsets[i]
+    for i in range(num_movies):
+        movie_offsets[i + 1] += movie_offsets[i]
+
+    # Scatter each edge into its movie's slot
+    cursor = array("q", movie_offsets)
+    for edge in edges:
+        person, movie = divmod(edge, num_movies)
+        movie_people[cursor[movie]] = person
+        cursor[movie] += 1
+
+    return person_offsets, person_movies, movie_offsets, movie_people
+
+
+def walk_back(reached_by, cast_from, source, target, limit=None):
+    """
+    Lazily yield up to `limit` shortest paths from `source` to `target`
+    as lists of (movie, person) pairs, given `reached_by`, mapping each
+    person reached by a layered breadth-first search to the movies it
+    was first reached through, and `cast_from`, mapping each of those
+    movies to the people in the layer before who starred in it.
+
+    Paths are built depth first from the target, so only the path in
+    progress is held in memory however many paths there are.
+    """
+    def predecessors(person):
+        for movie in reached_by[person]:
+            for parent in cast_from[movie]:
+                yield movie, parent
+
+    count = 0
+    path = []
+    stack = [predecessors(target)]
+    while stack and (limit is None or count < limit):
+        step = next(stack[-1], None)
+        if step is None:
+            stack.pop()
+            if path:
+                path.pop()
+            continue
+        path.append(step)
+        if step[1] != source:
+            stack.append(predecessors(step[1]))
+            continue
+        yield [
+            (path[i][0], path[i - 1][1] if i else target)
+            for i in range(len(path) - 1, -1, -1)
+        ]
+        count += 1
+        path.pop()
+
+
+class PeopleView(Mapping):
+    """
+    Read-only mapping from person_id to a dictionary of: name, birth,
+    movies (a set of movie_ids), backed by a `CompactGraph`.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        person = graph.person_index[person_id]
+        return {
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": {graph.movie_ids[m] for m in graph.movies_for(person)}
+        }
+
+    def __contains__(self, person_id):
+        return person_id in self.graph.person_index
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return len(self.graph.person_ids)
+
+
+class MoviesView(Mapping):
+    """
+    Read-only mapping from movie_id to a dictionary of: title, year,
+    stars (a set of person_ids), backed by a `CompactGraph`.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        movie = graph.movie_index[movie_id]
+        return {
+            "title": graph.movie_titles[movie],
+            "year": graph.movie_years[movie],
+            "stars": {graph.person_ids[p] for p in graph.stars_for(movie)}
+        }
+
+    def __contains__(self, movie_id):
+        return movie_id in self.graph.movie_index
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.graph.movie_ids)
@@ -0,0 +1,234 @@
+import heapq
+import json
+import math
+import mmap
+import os
+import sys
+from array import array
+
+MAGIC = b"DEGLMK1\0"
+VERSION = 2
+
+# Stored distance meaning a person cannot be reached from a landmark
+UNREACHABLE = 65535
+
+# Stored distance meaning a person is at least this far from a landmark,
+# so the landmark gives no bounds for them
+FAR = UNREACHABLE - 1
+
+
+class LandmarkIndex():
+    """
+    Breadth-first distances from a few high-degree landmark people to
+    everyone in a `CompactGraph`, used to bound degrees of separation
+    without searching and to guide searches that are still needed.
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = landmarks
+        self.distances = distances
+
+        # Number of people expanded by the most recent search
+        self.num_explored = 0
+
+    @classmethod
+    def build(cls, graph, k):
+        """Build an index over `graph` from its `k` best connected people."""
+        num_people = len(graph.person_ids)
+        offsets = graph.person_offsets
+        landmarks = heapq.nlargest(
+            k, range(num_people), key=lambda p: offsets[p + 1] - offsets[p]
+        )
+        return cls(
+            graph, landmarks,
+            [distances_from(graph, landmark) for landmark in landmarks]
+        )
+
+    def save(self, path, sources):
+        """
+        Write the index to `path`, keyed on `sources`, the stats of the
+        CSV files it was built from.
+        """
+        header = json.dumps({
+            "version": VERSION,
+            "byteorder": sys.byteorder,
+            "sources": sources,
+            "num_people": len(self.graph.person_ids),
+            "landmarks": [self.graph.person_ids[p] for p in self.landmarks],
+        }).encode("utf-8")
+        header += b" " * (-(len(MAGIC) + 8 + len(header)) % 8)
+        temp = f"{path}.tmp"
+        with open(temp, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            for distances in self.distances:
+                f.write(bytes(distances))
+        os.replace(temp, path)
+
+    @classmethod
+    def load(cls, graph, path, sources):
+        """
+        Memory-map the index at `path` for `graph`.
+        Return None if it is missing or was built from other `sources`.
+        """
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return None
+        with f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            header = json.loads(f.read(int.from_bytes(f.read(8), "little")))
+            if (
+                header["version"] != VERSION
+                or header["byteorder"] != sys.byteorder
+                or header["sources"] != sources
+                or header["num_people"] != len(graph.person_ids)
+            ):
+                return None
+            start = f.tell()
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(buffer)
+        size = header["num_people"] * array("H").itemsize
+        distances = [
+            view[start + i * size:start + (i + 1) * size].cast("H")
+            for i in range(len(header["landmarks"]))
+        ]
+        landmarks = [graph.person_index[p] for p in header["landmarks"]]
+        return cls(graph, landmarks, distances)
+
+    def nbytes(self):
+        """Return the size in bytes of the distance arrays."""
+        return sum(
+            len(distances) * distances.itemsize
+            for distances in self.distances
+        )
+
+    def bounds(self, source, target):
+        """
+        Return (lower, upper) bounds on the degrees of separation between
+        person indices `source` and `target`. Both are `math.inf` if some
+        landmark proves the two are not connected; `upper` is `math.inf`
+        if no landmark reaches them.
+        """
+        lower, upper = 0, math.inf
+        for distances in self.distances:
+            s, t = distances[source], distances[target]
+            if s == UNREACHABLE and t == UNREACHABLE:
+                continue
+            if s == FAR or t == FAR:
+                continue
+            if s == UNREACHABLE or t == UNREACHABLE:
+                return math.inf, math.inf
+            lower = max(lower, abs(s - t))
+            upper = min(upper, s + t)
+        if source == target:
+            return 0, 0
+        return lower, upper
+
+    def degrees(self, source, target):
+        """
+        Return the degrees of separation between `source` and `target`,
+        or None if they are not connected. Answered from the index alone
+        when its bounds meet, and by a bidirectional search otherwise.
+        """
+        self.num_explored = 0
+        lower, upper = self.bounds(source, target)
+        if lower == upper:
+            return None if lower == math.inf else lower
+        path = self.graph.bidirectional_path(source, target)
+        self.num_explored = self.graph.num_explored
+        return None if path is None else len(path)
+
+    def heuristic(self, person, target):
+        """
+        Return a lower bound on the distance from `person` to `target`,
+        or `math.inf` if a landmark shows they are not connected.
+        """
+        h = 0
+        for distances in self.distances:
+            p, t = distances[person], distances[target]
+            if p == UNREACHABLE and t == UNREACHABLE:
+                continue
+            if p == FAR or t == FAR:
+                continue
+            if p == UNREACHABLE or t == UNREACHABLE:
+                return math.inf
+            if abs(p - t) > h:
+                h = abs(p - t)
+        return h
+
+    def shortest_path(self, source, target):
+        """
+        A* search (ALT) from person index `source` to `target`, using
+        landmark lower bounds as the heuristic and pruning anyone whose
+        bound exceeds the best known upper bound.
+
+        Return a list of (movie, person) index pairs, or None if the two
+        are not connected.
+        """
+        self.num_explored = 0
+        lower, upper = self.bounds(source, target)
+        if lower == math.inf:
+            return None
+        if source == target:
+            return []
+        graph = self.graph
+
+        parents = {source: None}
+        costs = {source: 0}
+        estimates = {}
+        heap = [(lower, 0, source)]
+        closed = set()
+        while heap:
+            _, cost, person = heapq.heappop(heap)
+            cost = -cost
+            if person == target:
+                return graph._trace(parents, target)
+            if person in closed:
+                continue
+            closed.add(person)
+            self.num_explored += 1
+            for movie in graph.movies_for(person):
+                for star in graph.stars_for(movie):
+                    if star in closed or costs.get(star, math.inf) <= cost + 1:
+                        continue
+                    if star not in estimates:
+                        estimates[star] = self.heuristic(star, target)
+                    estimate = cost + 1 + estimates[star]
+                    if estimate > upper:
+                        continue
+                    costs[star] = cost + 1
+                    parents[star] = (movie, person)
+                    # Break ties towards the deepest person
+                    heapq.heappush(heap, (estimate, -(cost + 1), star))
+        return None
+
+
+def distances_from(graph, source):
+    """
+    Return an array of breadth-first distances from person index `source`
+    to every person in `graph`, with `UNREACHABLE` for people it cannot
+    reach and `FAR` for people at least that far away.
+    """
+    distances = array("H", [UNREACHABLE]) * len(graph.person_ids)
+    distances[source] = 0
+    seen_movies = set()
+    layer = [source]
+    depth = 0
+    while layer:
+        depth = min(depth + 1, FAR)
+        next_layer = []
+        for person in layer:
+            for movie in graph.movies_for(person):
+                if movie in seen_movies:
+                    continue
+                seen_movies.add(movie)
+                for star in graph.stars_for(movie):
+                    if distances[star] == UNREACHABLE:
+                        distances[star] = depth
+                        next_layer.append(star)
+        layer = next_layer
+    return distances
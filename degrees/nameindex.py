@@ -0,0 +1,175 @@
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+# Length of the n-grams used to find candidates for fuzzy lookups
+GRAM = 3
+
+
+class NameIndex(Mapping):
+    """
+    Mapping from lower-cased names to a set of person_ids, in the same
+    format as `degrees.names`, that also answers prefix and bounded
+    edit-distance lookups. People indexed later with `add` are kept
+    apart in `added`.
+
+    `names` is a sorted sequence of distinct lower-cased names. The
+    people named `names[k]` are the person indices from `offsets[k]` to
+    `offsets[k + 1]` in `people`, which index into `person_ids`.
+    """
+
+    def __init__(self, names, offsets, people, person_ids):
+        self.names = names
+        self.offsets = offsets
+        self.people = people
+        self.person_ids = person_ids
+
+        # Name indices for each n-gram, built by the first fuzzy lookup
+        self.grams = None
+
+        # People added since the index was built, by lower-cased name
+        self.added = {}
+
+    @classmethod
+    def build(cls, person_ids, person_names):
+        """Build an index over parallel sequences of IDs and names."""
+        groups = {}
+        for person, name in enumerate(person_names):
+            groups.setdefault(name.lower(), []).append(person)
+        names = sorted(groups)
+        people = array("i")
+        offsets = array("q", [0])
+        for name in names:
+            people.extend(groups[name])
+            offsets.append(len(people))
+        return cls(names, offsets, people, person_ids)
+
+    def __getitem__(self, name):
+        k = self.find(name)
+        if k is None:
+            if name in self.added:
+                return set(self.added[name])
+            raise KeyError(name)
+        return self.people_named(k) | self.added.get(name, set())
+
+    def __iter__(self):
+        yield from self.names
+        for name in self.added:
+            if self.find(name) is None:
+                yield name
+
+    def __len__(self):
+        new = sum(1 for name in self.added if self.find(name) is None)
+        return len(self.names) + new
+
+    def add(self, person_id, name):
+        """Index a person added after the index was built."""
+        self.added.setdefault(name.lower(), set()).add(person_id)
+
+    def find(self, name):
+        """Return the position of `name` in `names`, or None."""
+        names = self.names
+        k = bisect_left(names, name)
+        if k == len(names) or names[k] != name:
+            return None
+        return k
+
+    def people_named(self, k):
+        """Return the set of person_ids with the `k`th name."""
+        people = self.people[self.offsets[k]:self.offsets[k + 1]]
+        return {self.person_ids[person] for person in people}
+
+    def prefix(self, prefix, limit=None):
+        """
+        Return names starting with `prefix`, ignoring case, in sorted
+        order, up to `limit` of them.
+        """
+        prefix = prefix.lower()
+        names = self.names
+        matches = []
+        k = bisect_left(names, prefix)
+        while k < len(names) and (limit is None or len(matches) < limit):
+            name = names[k]
+            if not name.startswith(prefix):
+                break
+            matches.append(name)
+            k += 1
+        for name in self.added:
+            if name.startswith(prefix) and name not in matches:
+                matches.append(name)
+        matches.sort()
+        return matches if limit is None else matches[:limit]
+
+    def fuzzy(self, name, max_distance=2, limit=None):
+        """
+        Return (distance, name) pairs for names within `max_distance`
+        edits of `name`, ignoring case, closest first, up to `limit`.
+        """
+        name = name.lower()
+        names = self.names
+        grams = ngrams(name)
+
+        # A name within d edits shares all but at most GRAM * d of the
+        # query's n-grams, so candidates can be taken from the postings
+        needed = len(grams) - GRAM * max_distance
+        if needed > 0:
+            if self.grams is None:
+                self.grams = self.build_grams()
+            shared = {}
+            for gram in grams:
+                for k in self.grams.get(gram, ()):
+                    shared[k] = shared.get(k, 0) + 1
+            candidates = (k for k, count in shared.items() if count >= needed)
+        else:
+            candidates = range(len(names))
+
+        matches = []
+        for k in candidates:
+            candidate = names[k]
+            if abs(len(candidate) - len(name)) > max_distance:
+                continue
+            distance = edit_distance(name, candidate, max_distance)
+            if distance is not None:
+                matches.append((distance, candidate))
+        for candidate in self.added:
+            if self.find(candidate) is not None:
+                continue
+            distance = edit_distance(name, candidate, max_distance)
+            if distance is not None:
+                matches.append((distance, candidate))
+        matches.sort()
+        return matches if limit is None else matches[:limit]
+
+    def build_grams(self):
+        """Return a dict from each n-gram to the names containing it."""
+        postings = {}
+        for k, name in enumerate(self.names):
+            for gram in ngrams(name):
+                postings.setdefault(gram, array("i")).append(k)
+        return postings
+
+
+def ngrams(name):
+    """Return the set of n-grams of `name`, padded at both ends."""
+    padded = f"{' ' * (GRAM - 1)}{name}{' ' * (GRAM - 1)}"
+    return {padded[i:i + GRAM] for i in range(len(padded) - GRAM + 1)}
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Return the Levenshtein distance between `a` and `b` if it is at most
+    `max_distance`, otherwise None.
+    """
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (x != y)
+            ))
+        if min(current) > max_distance:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= max_distance else None
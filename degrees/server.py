@@ -0,0 +1,255 @@
+import argparse
+import asyncio
+import collections
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+from batch import resolve
+
+# Number of recent latencies kept for percentiles in the stats endpoint
+LATENCY_WINDOW = 10000
+
+
+def search(source_id, target_id, bidirectional):
+    """
+    Run `degrees.shortest_path` in a worker process.
+    Return (path, number of nodes explored).
+    """
+    path = degrees.shortest_path(
+        source_id, target_id, bidirectional=bidirectional
+    )
+    return path, degrees.num_explored
+
+
+def match_names(key, match, max_distance, limit):
+    """
+    Return the set of IDs of people whose names match `key` by "prefix"
+    or "fuzzy" `match`, in a worker process.
+    """
+    if match == "prefix":
+        names = degrees.names.prefix(key, limit)
+    else:
+        names = [n for _, n in degrees.names.fuzzy(key, max_distance, limit)]
+    return set().union(*(degrees.names[n] for n in names))
+
+
+def required(request, field):
+    """Return `field` of `request`, raising an error naming it if missing."""
+    try:
+        return request[field]
+    except KeyError:
+        raise Exception(f"missing field: {field}") from None
+
+
+def init_worker(directory, cache):
+    """Load the graph in a worker process that was not forked."""
+    if degrees.graph is None:
+        degrees.load_data(directory, compact=True, cache=cache)
+
+
+class Server():
+    """
+    Answers newline-delimited JSON requests against a graph that stays
+    loaded for the life of the process.
+
+    Each request is an object with an "op" of "path" (with "source" and
+    "target"), "resolve" (with "name") or "stats". Any "id" in a request
+    is echoed back in its response. A "resolve" request may also give a
+    "match" of "prefix" or "fuzzy", with a "max_distance" and "limit".
+    """
+
+    def __init__(self, pool, bidirectional=False, policy=None):
+        self.pool = pool
+        self.bidirectional = bidirectional
+        self.policy = policy
+        self.started = time.time()
+        self.counts = collections.Counter()
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.explored = 0
+
+    async def handle(self, reader, writer):
+        """Answer requests from one connection until it closes."""
+        try:
+            while line := await reader.readline():
+                start = time.perf_counter()
+                request = {}
+                try:
+                    request = json.loads(line)
+                    response = await self.dispatch(request)
+                except Exception as e:
+                    response = {"error": str(e)}
+                    self.counts["errors"] += 1
+                if isinstance(request, dict) and "id" in request:
+                    response["id"] = request["id"]
+                self.latencies.append(time.perf_counter() - start)
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def dispatch(self, request):
+        """Return the response to a single decoded request."""
+        op = request.get("op")
+        self.counts[op] += 1
+        if op == "path":
+            return await self.path(
+                required(request, "source"), required(request, "target")
+            )
+        elif op == "resolve":
+            return await self.resolve(
+                required(request, "name"),
+                match=request.get("match", "exact"),
+                max_distance=request.get("max_distance", 2),
+                limit=request.get("limit", 10)
+            )
+        elif op == "stats":
+            return self.stats()
+        raise Exception(f"unknown op: {op}")
+
+    async def path(self, source, target):
+        """Find the shortest path between two names or IDs."""
+        source_id = resolve(source, self.policy)
+        target_id = resolve(target, self.policy)
+        for value, person_id in ((source, source_id), (target, target_id)):
+            if person_id is None:
+                return {
+                    "error": "Person not found or ambiguous",
+                    "name": value,
+                    "candidates": (await self.resolve(value))["people"],
+                }
+
+        # Searches are CPU-bound, so keep them off the event loop
+        loop = asyncio.get_running_loop()
+        path, explored = await loop.run_in_executor(
+            self.pool, search, source_id, target_id, self.bidirectional
+        )
+        self.explored += explored
+        return {
+            "source_id": source_id,
+            "target_id": target_id,
+            "degrees": None if path is None else len(path),
+            "path": path,
+            "explored": explored,
+        }
+
+    async def resolve(self, name, match="exact", max_distance=2, limit=10):
+        """
+        List the people matching a name or ID. `match` may be "exact",
+        "prefix" or "fuzzy" to also find up to `limit` names starting
+        with `name` or within `max_distance` edits of it.
+        """
+        key = name.lower()
+        if name in degrees.people:
+            person_ids = {name}
+        elif match in ("prefix", "fuzzy"):
+            # Short keys can scan every name, so like searches these
+            # lookups are kept off the event loop
+            loop = asyncio.get_running_loop()
+            person_ids = await loop.run_in_executor(
+                self.pool, match_names, key, match, max_distance, limit
+            )
+        else:
+            person_ids = degrees.names.get(key, set())
+        people = []
+        for person_id in sorted(person_ids):
+            person = degrees.people[person_id]
+            people.append({
+                "id": person_id,
+                "name": person["name"],
+                "birth": person["birth"],
+            })
+        return {"people": people}
+
+    def stats(self):
+        """Report query counts, latency percentiles and nodes explored."""
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            k = min(len(latencies) - 1, int(p / 100 * len(latencies)))
+            return round(latencies[k] * 1000, 3)
+
+        return {
+            "uptime": round(time.time() - self.started, 3),
+            "counts": dict(self.counts),
+            "latency_ms": {
+                "p50": percentile(50),
+                "p90": percentile(90),
+                "p99": percentile(99),
+                "max": percentile(100),
+            },
+            "explored": self.explored,
+        }
+
+
+async def serve(server, host, port, unix):
+    """Listen on a Unix socket if `unix` is given, otherwise on TCP."""
+    if unix:
+        listener = await asyncio.start_unix_server(server.handle, path=unix)
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+    for sock in listener.sockets:
+        print(f"Listening on {sock.getsockname()}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        if unix and os.path.exists(unix):
+            os.unlink(unix)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve degrees of separation queries over a socket."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket instead")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(),
+        help="number of search processes (default: one per CPU)"
+    )
+    parser.add_argument(
+        "--cache", action="store_true",
+        help="load the graph from a binary snapshot"
+    )
+    parser.add_argument(
+        "--bidirectional", action="store_true",
+        help="use bidirectional search"
+    )
+    parser.add_argument(
+        "--policy", choices=degrees.POLICIES,
+        help="how to choose between people who share a name"
+    )
+    args = parser.parse_args()
+
+    print("Loading data...")
+    degrees.load_data(args.directory, compact=True, cache=args.cache)
+    print("Data loaded.")
+
+    # Forked workers share the loaded graph copy-on-write
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    with ProcessPoolExecutor(
+        args.workers, mp_context=context,
+        initializer=init_worker, initargs=(args.directory, args.cache)
+    ) as pool:
+        server = Server(
+            pool, bidirectional=args.bidirectional, policy=args.policy
+        )
+        try:
+            asyncio.run(serve(server, args.host, args.port, args.unix))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
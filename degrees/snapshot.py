@@ -0,0 +1,212 @@
+import json
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+
+from graph import CompactGraph
+from nameindex import NameIndex
+
+MAGIC = b"DEGSNAP1"
+VERSION = 1
+SOURCES = ["people.csv", "movies.csv", "stars.csv"]
+
+# Names of the string columns and CSR arrays of a `CompactGraph`
+COLUMNS = [
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years",
+]
+ARRAYS = [
+    "person_offsets", "person_movies", "movie_offsets", "movie_people",
+]
+
+
+class StringColumn(Sequence):
+    """
+    Read-only sequence of strings stored as one UTF-8 blob plus an
+    offsets array; each string is decoded only when it is accessed.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class SortedIndex(Mapping):
+    """
+    Read-only mapping from each string in `column` to its position,
+    answered by binary search over `order`, the positions sorted by value.
+    """
+
+    def __init__(self, column, order):
+        self.column = column
+        self.order = order
+
+    def __getitem__(self, key):
+        column, order = self.column, self.order
+        k = bisect_left(range(len(order)), key, key=lambda k: column[order[k]])
+        if k == len(order) or column[order[k]] != key:
+            raise KeyError(key)
+        return order[k]
+
+    def __iter__(self):
+        return iter(self.column)
+
+    def __len__(self):
+        return len(self.column)
+
+
+def source_stats(directory):
+    """Return the (mtime, size) of each source CSV file in `directory`."""
+    stats = {}
+    for filename in SOURCES:
+        stat = os.stat(os.path.join(directory, filename))
+        stats[filename] = [stat.st_mtime_ns, stat.st_size]
+    return stats
+
+
+def encode_column(strings):
+    """Return (blob, offsets) encoding a sequence of strings."""
+    offsets = array("q", [0])
+    chunks = []
+    for string in strings:
+        chunk = string.encode("utf-8")
+        chunks.append(chunk)
+        offsets.append(offsets[-1] + len(chunk))
+    return b"".join(chunks), offsets
+
+
+def write(path, graph, directory):
+    """
+    Write `graph`, along with a name index over it, to the snapshot file
+    at `path`, keyed on the current state of the CSV files in `directory`.
+    """
+    sections = {}
+    for column in COLUMNS:
+        blob, offsets = encode_column(getattr(graph, column))
+        sections[f"{column}.blob"] = blob
+        sections[f"{column}.offsets"] = offsets
+    for name in ARRAYS:
+        sections[name] = getattr(graph, name)
+    for column in ("person_ids", "movie_ids"):
+        values = getattr(graph, column)
+        sections[f"{column}.order"] = array(
+            "i", sorted(range(len(values)), key=values.__getitem__)
+        )
+
+    # Index people by lower-cased name, sorted so lookups can bisect
+    index = NameIndex.build(graph.person_ids, graph.person_names)
+    blob, offsets = encode_column(index.names)
+    sections["names.blob"] = blob
+    sections["names.offsets"] = offsets
+    sections["names.people"] = index.people
+    sections["names.people_offsets"] = index.offsets
+
+    # Lay sections out after the header, each aligned to 8 bytes
+    layout = {}
+    position = 0
+    for name, data in sections.items():
+        typecode = data.typecode if isinstance(data, array) else "B"
+        nbytes = len(data) * (data.itemsize if isinstance(data, array) else 1)
+        layout[name] = [position, nbytes, typecode]
+        position += nbytes + (-nbytes % 8)
+    header = json.dumps({
+        "version": VERSION,
+        "byteorder": sys.byteorder,
+        "sources": source_stats(directory),
+        "sections": layout,
+    }).encode("utf-8")
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % 8)
+
+    # Write to a temporary file first so readers never see a partial file
+    temp = f"{path}.tmp"
+    with open(temp, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for name, data in sections.items():
+            data = data.tobytes() if isinstance(data, array) else data
+            f.write(data)
+            f.write(b"\0" * (-len(data) % 8))
+    os.replace(temp, path)
+
+
+def read_header(f):
+    """Return the JSON header of an open snapshot file, or None."""
+    if f.read(len(MAGIC)) != MAGIC:
+        return None
+    length = int.from_bytes(f.read(8), "little")
+    return json.loads(f.read(length))
+
+
+def is_fresh(path, directory):
+    """
+    Return True if the snapshot at `path` exists and was built from the
+    CSV files currently in `directory`.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = read_header(f)
+    except (OSError, ValueError):
+        return False
+    return (
+        header is not None
+        and header["version"] == VERSION
+        and header["byteorder"] == sys.byteorder
+        and header["sources"] == source_stats(directory)
+    )
+
+
+def load(path):
+    """
+    Memory-map the snapshot at `path`.
+    Return (graph, names), where `graph` is a `CompactGraph` whose tables
+    and adjacency are zero-copy views of the file, and `names` maps
+    lower-cased names to sets of person_ids.
+    """
+    with open(path, "rb") as f:
+        header = read_header(f)
+        start = f.tell()
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(buffer)
+
+    def section(name):
+        offset, nbytes, typecode = header["sections"][name]
+        data = view[start + offset:start + offset + nbytes]
+        return data if typecode == "B" else data.cast(typecode)
+
+    columns = {
+        column: StringColumn(
+            section(f"{column}.blob"), section(f"{column}.offsets")
+        )
+        for column in COLUMNS
+    }
+    graph = CompactGraph(
+        **columns,
+        **{name: section(name) for name in ARRAYS},
+        person_index=SortedIndex(
+            columns["person_ids"], section("person_ids.order")
+        ),
+        movie_index=SortedIndex(
+            columns["movie_ids"], section("movie_ids.order")
+        ),
+    )
+    names = NameIndex(
+        StringColumn(section("names.blob"), section("names.offsets")),
+        section("names.people_offsets"),
+        section("names.people"),
+        graph.person_ids
+    )
+    return graph, names
@@ -0,0 +1,114 @@
+import argparse
+import csv
+import itertools
+import os
+import random
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael",
+    "Linda", "William", "Elizabeth", "David", "Barbara", "Richard", "Susan",
+    "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen", "Emma",
+    "Daniel", "Nancy", "Matthew", "Lisa", "Anthony", "Betty", "Mark",
+    "Margaret", "Donald", "Sandra", "Steven", "Ashley", "Paul", "Kimberly",
+    "Andrew", "Emily", "Joshua", "Donna", "Kenneth", "Michelle", "Kevin",
+    "Dorothy", "Brian", "Carol", "George", "Amanda", "Timothy", "Melissa",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller",
+    "Davis", "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez",
+    "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark",
+    "Ramirez", "Lewis", "Robinson", "Walker", "Young", "Allen", "King",
+    "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores", "Green",
+    "Adams", "Nelson", "Baker", "Hall", "Rivera", "Campbell", "Mitchell",
+]
+TITLE_WORDS = [
+    "Night", "Return", "Secret", "Last", "City", "Dark", "Love", "War",
+    "House", "Road", "Star", "Dream", "Game", "Shadow", "River", "King",
+    "Ghost", "Summer", "Fire", "Storm", "Blood", "Heart", "Wild", "Lost",
+]
+
+
+def generate(directory, num_stars, seed=0, alpha=2.0, beta=0.6,
+             max_cast=200):
+    """
+    Write an IMDb-shaped people.csv, movies.csv and stars.csv with about
+    `num_stars` star rows to `directory`.
+
+    Cast sizes follow a Pareto distribution with shape `alpha`, capped
+    at `max_cast`, and each person's chance of being cast falls off as
+    their rank to the power `beta`, so a few actors appear in very many
+    movies.
+
+    Return (number of people, number of movies, number of star rows).
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    # Roughly IMDb's ratios of stars to people and to movies
+    num_people = max(2, num_stars // 3)
+    num_movies = max(1, num_stars // 4)
+
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for person in range(num_people):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            if rng.random() < 0.5:
+                name += f" {chr(ord('A') + rng.randrange(26))}."
+            birth = rng.randrange(1900, 2010) if rng.random() < 0.8 else ""
+            writer.writerow([person + 1, name, birth])
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for movie in range(num_movies):
+            title = " ".join(rng.sample(TITLE_WORDS, rng.randint(1, 3)))
+            writer.writerow([movie + 1, title, rng.randrange(1920, 2024)])
+
+    # Scale power-law cast sizes so they add up to about num_stars
+    casts = [
+        min(max_cast, int(rng.paretovariate(alpha)))
+        for _ in range(num_movies)
+    ]
+    scale = num_stars / sum(casts)
+    casts = [max(1, min(max_cast, round(cast * scale))) for cast in casts]
+
+    popularity = list(itertools.accumulate(
+        (rank + 1) ** -beta for rank in range(num_people)
+    ))
+    rows = 0
+    with open(os.path.join(directory, "stars.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie, cast in enumerate(casts):
+            chosen = set(rng.choices(
+                range(num_people), cum_weights=popularity, k=cast
+            ))
+            for person in chosen:
+                writer.writerow([person + 1, movie + 1])
+            rows += len(chosen)
+    return num_people, num_movies, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic people/movies/stars dataset."
+    )
+    parser.add_argument("directory")
+    parser.add_argument(
+        "--stars", type=int, default=100000,
+        help="approximate number of star rows (default: 100000)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    people, movies, stars = generate(args.directory, args.stars, args.seed)
+    print(f"Wrote {people} people, {movies} movies and {stars} stars "
+          f"to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
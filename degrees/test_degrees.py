@@ -0,0 +1,64 @@
+import math
+import os
+import shutil
+import tempfile
+import unittest
+from array import array
+
+import degrees
+from landmarks import FAR, UNREACHABLE, LandmarkIndex
+
+
+class LandmarkUpdateTest(unittest.TestCase):
+
+    def setUp(self):
+        # Landmark indexes are written next to the data, so use a copy
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        shutil.copytree(
+            os.path.join(os.path.dirname(__file__), "small"),
+            self.directory, dirs_exist_ok=True
+        )
+        degrees.path_cache = None
+        degrees.load_data(self.directory, compact=True)
+        degrees.load_landmarks(self.directory)
+        self.addCleanup(setattr, degrees, "oracle", None)
+
+    def test_add_person_after_landmarks(self):
+        degrees.add_person("999", "New Person", "2000")
+        self.assertIsNone(degrees.oracle)
+        self.assertIsNone(degrees.shortest_path("102", "999"))
+
+        degrees.add_movie("999999", "New Movie", "2020")
+        degrees.add_stars([("102", "999999"), ("999", "999999")])
+        self.assertEqual(
+            degrees.shortest_path("102", "999"), [("999999", "999")]
+        )
+
+    def test_add_movie_after_landmarks(self):
+        expected = degrees.shortest_path("102", "129")
+        degrees.add_movie("999999", "New Movie", "2020")
+        self.assertIsNone(degrees.oracle)
+        self.assertEqual(
+            len(degrees.shortest_path("102", "129")), len(expected)
+        )
+
+
+class LandmarkBoundsTest(unittest.TestCase):
+
+    def test_far_people_are_not_pruned(self):
+        # People at least FAR from a landmark are still connected
+        index = LandmarkIndex(None, [0], [array("H", [0, FAR, FAR])])
+        self.assertEqual(index.bounds(1, 2), (0, math.inf))
+        self.assertEqual(index.heuristic(1, 2), 0)
+        self.assertEqual(index.bounds(0, 1), (0, math.inf))
+
+    def test_unreachable_people_are_pruned(self):
+        index = LandmarkIndex(None, [0], [array("H", [0, 3, UNREACHABLE])])
+        self.assertEqual(index.bounds(1, 2), (math.inf, math.inf))
+        self.assertEqual(index.heuristic(1, 2), math.inf)
+        self.assertEqual(index.bounds(0, 1), (3, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
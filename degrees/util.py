@@ -1,3 +1,6 @@
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent):
         self.state = state
@@ -7,42 +10,44 @@ class Node():
 class StackFrontier():
     def __init__(self):
         self.frontier = []
+        self.states = {}
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
 
+    def __len__(self):
+        return len(self.frontier)
+
+    def _discard(self, node):
+        self.states[node.state] -= 1
+        if self.states[node.state] == 0:
+            del self.states[node.state]
+
     def remove(self):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
+            node = self.frontier.pop()
+            self._discard(node)
             return node
 
 
-class QueueFrontier():
+class QueueFrontier(StackFrontier):
     def __init__(self):
-        self.frontier = []
-
-    def add(self, node):
-        self.frontier.append(node)
-
-    def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        self.frontier = deque()
+        self.states = {}
 
-    def empty(self):
-        return len(self.frontier) == 0
-        
     def remove(self):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
+            node = self.frontier.popleft()
+            self._discard(node)
             return node
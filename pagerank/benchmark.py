@@ -0,0 +1,295 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import solvers
+import synthetic
+from crawler import LINK_CACHE, crawl_links
+from edgefile import MappedLinks, write_crawl
+from linkmatrix import LinkMatrix
+from pagerank import DAMPING, SAMPLES, crawl
+from sampling import sample_ranks
+
+# Largest corpus the original pure-Python iteration is timed on
+REFERENCE_LIMIT = 2000
+
+# L1 change between sweeps at which the ranks every engine is compared
+# against are taken to have converged
+EXACT_TOLERANCE = 1e-12
+
+# Stages `run_suite` measures, in order; "crawl-edgefile" writes the
+# edge file the rank engines load and "exact" the ranks they are
+# compared against, and "original" only runs on small corpora
+STAGES = [
+    "crawl",
+    "crawl-cached",
+    "crawl-edgefile",
+    "exact",
+    "iterate",
+    "gauss-seidel",
+    "quadratic",
+    "mapped",
+    "sample",
+    "mapped-sample",
+    "original",
+]
+
+
+def reference_pagerank(corpus, damping_factor):
+    """
+    The original pure-Python iteration, which scans every pair of pages
+    on each sweep, kept for timing comparisons.
+    """
+    prob = {}
+    change = {}
+    for page in list(corpus.keys()):
+        prob.update({page: (1 / len(corpus))})
+        change.update({page: 999})
+    while max(list(change.values())) > 0.001:
+        for page in list(corpus.keys()):
+            summation = 0
+            for page_iter in list(corpus.keys()):
+                if len(corpus[page_iter]) == 0:
+                    summation += 1 / len(corpus)
+                elif page in corpus[page_iter]:
+                    summation += prob[page_iter] / len(corpus[page_iter])
+            temp_prob = (
+                (1 - damping_factor) / len(corpus) + damping_factor * summation
+            )
+            change[page] = abs(prob[page] - temp_prob)
+            prob[page] = temp_prob
+    return prob
+
+
+def load_matrix(graph):
+    """Read the edge file at `graph` into an in-memory `LinkMatrix`."""
+    mapped = MappedLinks.load(graph)
+    sources = np.repeat(
+        np.arange(len(mapped), dtype=np.int32), mapped.out_degree
+    )
+    return LinkMatrix(list(mapped.pages), sources, np.array(mapped.targets))
+
+
+def run_stage(stage, directory, graph, samples):
+    """
+    Run one of `STAGES` on the corpus in `directory`, whose edge file is
+    `graph`. Loading the links a rank engine needs is not timed.
+
+    Return (seconds, peak RSS in KB before timing began, ranks in sorted
+    page order or None for the crawl stages).
+    """
+    if stage in ("mapped", "mapped-sample"):
+        links = MappedLinks.load(graph)
+    elif stage == "original":
+        corpus = crawl(directory)
+    elif not stage.startswith("crawl"):
+        links = load_matrix(graph)
+    setup = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    ranks = None
+    start = time.perf_counter()
+    if stage in ("crawl", "crawl-cached"):
+        crawl_links(directory, cache=True)
+    elif stage == "crawl-edgefile":
+        write_crawl(graph, directory)
+    elif stage == "exact":
+        ranks = links.power_iteration(DAMPING, EXACT_TOLERANCE)
+    elif stage in ("iterate", "mapped"):
+        ranks = links.power_iteration(DAMPING)
+    elif stage in ("gauss-seidel", "quadratic"):
+        ranks, _ = solvers.solve(links, DAMPING, stage)
+    elif stage in ("sample", "mapped-sample"):
+        ranks, _ = sample_ranks(links, DAMPING, samples, seed=0)
+    elif stage == "original":
+        reference = reference_pagerank(corpus, DAMPING)
+        ranks = np.array([reference[page] for page in sorted(corpus)])
+
+        # The original gives each dangling page a flat 1/N share rather
+        # than spreading its rank, so its values do not sum to one
+        ranks /= ranks.sum()
+    else:
+        raise ValueError(f"unknown stage: {stage}")
+    return time.perf_counter() - start, setup, ranks
+
+
+# Run in a fresh interpreter so that peak RSS covers only one stage;
+# saves any ranks to the output path and prints a JSON object
+MEASURE = """
+import json, resource, sys
+import numpy as np
+import benchmark
+stage, directory, graph, samples, output = sys.argv[1:]
+seconds, setup, ranks = benchmark.run_stage(
+    stage, directory, graph, int(samples)
+)
+if ranks is not None:
+    np.save(output, ranks)
+print(json.dumps({
+    "seconds": seconds,
+    "setup_rss_kb": setup,
+    "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "ranks": ranks is not None,
+}))
+"""
+
+
+def measure(stage, directory, graph, samples):
+    """
+    Run `stage` in a new process. Return the dict of measurements it
+    prints and its ranks, or None if it does not rank.
+    """
+    with tempfile.TemporaryDirectory() as temp:
+        output = os.path.join(temp, "ranks.npy")
+        result = json.loads(subprocess.run(
+            [sys.executable, "-c", MEASURE, stage, os.path.abspath(directory),
+             os.path.abspath(graph), str(samples), output],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout)
+        ranks = np.load(output) if result["ranks"] else None
+    return result, ranks
+
+
+def run_suite(directory, samples=SAMPLES, stages=None):
+    """
+    Measure crawling `directory` and ranking it with each engine, every
+    stage in a fresh process. Return a JSON-serializable dict of the
+    wall time, peak RSS and, for rank engines, the L1 error against
+    tightly converged iteration, per stage.
+    """
+    # Start from a cold link cache so the first crawl parses every page,
+    # keeping any cache already in the directory aside to put back
+    # afterwards
+    cache = os.path.join(directory, LINK_CACHE)
+    results = {}
+    exact = None
+    with tempfile.TemporaryDirectory() as temp:
+        saved = os.path.join(temp, LINK_CACHE)
+        if os.path.exists(cache):
+            shutil.move(cache, saved)
+        graph = os.path.join(temp, "graph.links")
+        try:
+            for stage in STAGES:
+                # Engines need the edge file and the exact ranks to
+                # compare against, and a cached crawl needs a first
+                # crawl, so those stages run even when not measured
+                required = stage in ("crawl-edgefile", "exact") or (
+                    stage == "crawl" and "crawl-cached" in (stages or ())
+                )
+                measured = stages is None or stage in stages
+                if not measured and not required:
+                    continue
+                if stage == "original" and len(exact) > REFERENCE_LIMIT:
+                    continue
+                result, ranks = measure(stage, directory, graph, samples)
+                if stage == "exact":
+                    exact = ranks
+                    info = MappedLinks.load(graph)
+                    num_links = int(info.offsets[-1])
+                    dangling = float(info.dangling.mean())
+                if not measured:
+                    continue
+                results[stage] = {
+                    "seconds": result["seconds"],
+                    "setup_rss_mb": result["setup_rss_kb"] / 1024,
+                    "peak_rss_mb": result["peak_rss_kb"] / 1024,
+                    "l1_error": None if ranks is None
+                    else float(np.abs(ranks - exact).sum()),
+                }
+        finally:
+            if os.path.exists(cache):
+                os.remove(cache)
+            if os.path.exists(saved):
+                shutil.move(saved, cache)
+
+    return {
+        "directory": directory,
+        "pages": len(exact),
+        "links": num_links,
+        "dangling": dangling,
+        "damping": DAMPING,
+        "samples": samples,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "stages": results,
+    }
+
+
+def print_suite(report):
+    """Print the results of `run_suite` as a table."""
+    print(f"{report['directory']}: {report['pages']} pages, "
+          f"{report['links']} links, {report['dangling']:.0%} dangling")
+    print(f"{'stage':<16}{'seconds':>10}{'RSS (MB)':>10}{'L1 error':>12}")
+    for stage, result in report["stages"].items():
+        error = result["l1_error"]
+        print(f"{stage:<16}{result['seconds']:>10.4f}"
+              f"{result['peak_rss_mb']:>10.1f}"
+              f"{'' if error is None else f'{error:.2e}':>12}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark crawling and ranking synthetic corpora."
+    )
+    parser.add_argument(
+        "directories", nargs="*",
+        help="existing corpora to benchmark as well as synthetic ones"
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="*", default=[1000, 10000, 100000],
+        help="numbers of pages in synthetic corpora "
+             "(default: 1000 10000 100000)"
+    )
+    parser.add_argument(
+        "--links", type=float, default=8,
+        help="average number of links on synthetic pages with links "
+             "(default: 8)"
+    )
+    parser.add_argument(
+        "--dangling", type=float, default=0.1,
+        help="share of synthetic pages with no links (default: 0.1)"
+    )
+    parser.add_argument(
+        "--samples", type=int, default=SAMPLES,
+        help=f"samples for the sampling engines (default: {SAMPLES})"
+    )
+    parser.add_argument(
+        "--stages", nargs="+", choices=STAGES,
+        help="stages to measure (default: all)"
+    )
+    parser.add_argument(
+        "--json", metavar="FILE", help="write the results as JSON to FILE"
+    )
+    args = parser.parse_args()
+
+    reports = []
+    for directory in args.directories:
+        report = run_suite(directory, args.samples, args.stages)
+        print_suite(report)
+        reports.append(report)
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as temp:
+            synthetic.generate(temp, n, args.links, args.dangling)
+            report = run_suite(temp, args.samples, args.stages)
+            report["directory"] = f"synthetic-{n}"
+            print_suite(report)
+            reports.append(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Name of the file in a corpus directory caching each page's links
+LINK_CACHE = ".links.json"
+VERSION = 1
+
+# Fewest changed files worth starting worker processes for
+PARALLEL_THRESHOLD = 256
+
+
+def extract_links(path):
+    """Return the set of links in the HTML file at `path`."""
+    with open(path) as f:
+        return set(LINK.findall(f.read()))
+
+
+def parse_chunk(paths):
+    """Return (filename, links) for each HTML file in `paths`."""
+    return [
+        (os.path.basename(path), sorted(extract_links(path)))
+        for path in paths
+    ]
+
+
+def crawl_links(directory, workers=None, cache=False):
+    """
+    Parse a directory of HTML pages for links to other pages, as `crawl`
+    does, reading files in `workers` processes.
+
+    If `cache` is True, each page's links are kept in `LINK_CACHE` in the
+    directory, keyed on the file's modification time and size, and only
+    files that changed since the last crawl are parsed again.
+
+    Return (pages, stats), where `pages` maps each page to the set of
+    other pages in the corpus it links to, and `stats` has the numbers
+    of files seen and parsed, the time taken and files per second.
+    """
+    start = time.perf_counter()
+    cache_path = os.path.join(directory, LINK_CACHE)
+    cached = load_cache(cache_path) if cache else {}
+
+    # Reuse links for files whose modification time and size are unchanged
+    entries = {}
+    pages = {}
+    stale = []
+    with os.scandir(directory) as scan:
+        for entry in scan:
+            if not entry.name.endswith(".html"):
+                continue
+            info = entry.stat()
+            key = [info.st_mtime_ns, info.st_size]
+            entries[entry.name] = key
+            hit = cached.get(entry.name)
+            if hit is not None and hit["key"] == key:
+                pages[entry.name] = set(hit["links"])
+            else:
+                stale.append(entry.path)
+
+    # Parse the rest in chunks, adding links as each chunk completes
+    parsed = {}
+    for filename, links in parse_files(stale, workers):
+        parsed[filename] = links
+        pages[filename] = set(links)
+    if cache and (parsed or len(cached) != len(entries)):
+        save_cache(cache_path, {
+            filename: {
+                "key": entries[filename],
+                "links": parsed[filename] if filename in parsed
+                else cached[filename]["links"]
+            }
+            for filename in entries
+        })
+
+    # Only include links to other pages in the corpus
+    for filename in pages:
+        pages[filename] = {
+            link for link in pages[filename]
+            if link in pages and link != filename
+        }
+
+    elapsed = time.perf_counter() - start
+    return pages, {
+        "files": len(entries),
+        "parsed": len(stale),
+        "cached": len(entries) - len(stale),
+        "seconds": elapsed,
+        "files_per_second": len(entries) / elapsed if elapsed else None,
+    }
+
+
+def parse_files(paths, workers=None):
+    """
+    Yield (filename, sorted links) for each path, parsing in a pool of
+    `workers` processes when there are enough files to be worth it.
+    """
+    if workers is None:
+        workers = os.cpu_count()
+    if workers <= 1 or len(paths) < PARALLEL_THRESHOLD:
+        yield from parse_chunk(paths)
+        return
+    size = max(1, min(1024, len(paths) // (workers * 4)))
+    chunks = [paths[i:i + size] for i in range(0, len(paths), size)]
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        for results in pool.map(parse_chunk, chunks):
+            yield from results
+
+
+def load_cache(path):
+    """Return the cached links at `path`, or an empty dict if unusable."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != VERSION:
+        return {}
+    return data["pages"]
+
+
+def save_cache(path, pages):
+    """
+    Write `pages` to the link cache at `path`, or do nothing if it cannot
+    be written, as for a read-only corpus.
+    """
+    temp = f"{path}.tmp"
+    try:
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION, "pages": pages}, f)
+        os.replace(temp, path)
+    except OSError:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
@@ -0,0 +1,293 @@
+import argparse
+import json
+import mmap
+import os
+import shutil
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+from functools import cached_property
+
+import numpy as np
+
+from crawler import parse_files
+from linkmatrix import LinkMatrix
+from pagerank import DAMPING, SAMPLES
+from sampling import sample_ranks
+
+MAGIC = b"PRLINKS1"
+VERSION = 1
+
+# Sections of an edge file, in order, with their NumPy types
+SECTIONS = [
+    ("names", np.uint8),
+    ("name_offsets", np.int64),
+    ("offsets", np.int64),
+    ("targets", np.int32),
+]
+
+# Most links read from the targets array at once in each sweep
+CHUNK_LINKS = 1 << 22
+
+
+class NameTable(Sequence):
+    """
+    Read-only sorted sequence of page names stored as one UTF-8 blob plus
+    an offsets array; each name is decoded only when it is accessed.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return bytes(self.blob[start:end]).decode("utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class PageIndex(Mapping):
+    """Mapping from page names to positions in a sorted `NameTable`."""
+
+    def __init__(self, names):
+        self.names = names
+
+    def __getitem__(self, page):
+        k = bisect_left(self.names, page)
+        if k == len(self.names) or self.names[k] != page:
+            raise KeyError(page)
+        return k
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class MappedLinks(LinkMatrix):
+    """
+    `LinkMatrix` over an edge file memory-mapped from disk, so only
+    per-page arrays are held in memory however many links there are.
+
+    Rather than per-link source and weight arrays, each page's links are
+    the slice of `targets` from `offsets[p]` to `offsets[p + 1]`, and
+    sweeps read them a chunk of pages at a time. `sources` and `weights`
+    are still available to code written for `LinkMatrix`, but are only
+    built, in memory, the first time they are used.
+    """
+
+    def __init__(self, pages, offsets, targets):
+        self.pages = pages
+        self.index = PageIndex(pages)
+        self.offsets = offsets
+        self.targets = targets
+        self.out_degree = np.diff(offsets)
+        self.dangling = self.out_degree == 0
+        self.share = np.zeros(len(pages))
+        self.share[~self.dangling] = 1 / self.out_degree[~self.dangling]
+
+        # Pages whose links add up to about CHUNK_LINKS, starting at 0
+        self.chunks = [0]
+        while self.chunks[-1] < len(pages):
+            start = self.chunks[-1]
+            end = np.searchsorted(
+                offsets, offsets[start] + CHUNK_LINKS, side="right"
+            ) - 1
+            self.chunks.append(min(len(pages), max(start + 1, end)))
+
+        self.iterations = 0
+
+    @cached_property
+    def sources(self):
+        """The source page of every link, in the order of `targets`."""
+        return np.repeat(
+            np.arange(len(self.pages), dtype=np.int32), self.out_degree
+        )
+
+    @cached_property
+    def weights(self):
+        """The share of its source's rank each link carries."""
+        return self.share[self.sources]
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map the edge file at `path`."""
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise Exception(f"{path} is not an edge file")
+            header = json.loads(f.read(int.from_bytes(f.read(8), "little")))
+            if header["version"] != VERSION:
+                raise Exception(f"{path} has unsupported version")
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        sections = {
+            name: np.frombuffer(
+                buffer, dtype=dtype, count=header["sections"][name][1],
+                offset=header["sections"][name][0]
+            )
+            for name, dtype in SECTIONS
+        }
+        pages = NameTable(sections["names"], sections["name_offsets"])
+        return cls(pages, sections["offsets"], sections["targets"])
+
+    def follow(self, ranks):
+        """
+        Return the rank each page receives over links when every page
+        with links splits its rank in `ranks` evenly between them,
+        streaming through the targets a chunk at a time.
+        """
+        if ranks.ndim == 2:
+            return np.stack([self.follow(row) for row in ranks])
+        n = len(self.pages)
+        share = ranks * self.share
+        result = np.zeros(n)
+        chunks = self.chunks
+        for start, end in zip(chunks, chunks[1:]):
+            degree = self.out_degree[start:end]
+            sources = np.repeat(share[start:end], degree)
+            targets = self.targets[self.offsets[start]:self.offsets[end]]
+            result += np.bincount(targets, weights=sources, minlength=n)
+        return result
+
+    def spread(self, pages, amounts):
+        """
+        Return the rank each page receives when each of `pages`, which
+        must all have links, splits the matching entry of `amounts`
+        evenly between its links.
+        """
+        result = np.zeros(len(self.pages))
+        for page, amount in zip(pages.tolist(), amounts.tolist()):
+            targets = self.targets[self.offsets[page]:self.offsets[page + 1]]
+            np.add.at(result, targets, amount / len(targets))
+        return result
+
+
+def write(path, links):
+    """Write the pages and links of a `LinkMatrix` to an edge file."""
+    def copy_targets(f):
+        f.write(np.ascontiguousarray(links.targets, dtype=np.int32).data)
+
+    write_sections(
+        path, links.pages, links.offsets, len(links.targets), copy_targets
+    )
+
+
+def write_crawl(path, directory, workers=None):
+    """
+    Crawl a directory of HTML pages straight into an edge file, holding
+    only per-page arrays in memory, with links streamed to a temporary
+    file as each page is parsed.
+
+    Return the number of pages and links written.
+    """
+    pages = sorted(
+        name for name in os.listdir(directory) if name.endswith(".html")
+    )
+    index = {page: i for i, page in enumerate(pages)}
+    offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+    temp = f"{path}.targets"
+    paths = [os.path.join(directory, page) for page in pages]
+    with open(temp, "wb") as f:
+        for i, (page, links) in enumerate(parse_files(paths, workers)):
+            targets = sorted({
+                index[link] for link in links
+                if link in index and link != page
+            })
+            f.write(np.array(targets, dtype=np.int32).tobytes())
+            offsets[i + 1] = offsets[i] + len(targets)
+
+    def copy_targets(f):
+        with open(temp, "rb") as targets:
+            shutil.copyfileobj(targets, f)
+
+    try:
+        write_sections(path, pages, offsets, int(offsets[-1]), copy_targets)
+    finally:
+        os.remove(temp)
+    return len(pages), int(offsets[-1])
+
+
+def write_sections(path, pages, offsets, num_links, copy_targets):
+    """
+    Write an edge file of sorted `pages`, link `offsets` and `num_links`
+    targets, written to the open file by `copy_targets`. Each section
+    is aligned to 8 bytes.
+    """
+    encoded = [page.encode("utf-8") for page in pages]
+    name_offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+    np.cumsum([len(name) for name in encoded], out=name_offsets[1:])
+    lengths = {
+        "names": int(name_offsets[-1]),
+        "name_offsets": len(name_offsets),
+        "offsets": len(offsets),
+        "targets": num_links,
+    }
+
+    # Section positions depend on the header's length, and it on them,
+    # so lay out the sections for a header padded to a fixed length
+    header_size = 1024
+    position = len(MAGIC) + 8 + header_size
+    sections = {}
+    for name, dtype in SECTIONS:
+        position += -position % 8
+        sections[name] = [position, lengths[name]]
+        position += lengths[name] * np.dtype(dtype).itemsize
+    header = json.dumps({
+        "version": VERSION,
+        "num_pages": len(pages),
+        "num_links": num_links,
+        "sections": sections,
+    }).encode("utf-8")
+    if len(header) > header_size:
+        raise Exception("edge file header is too long")
+    header += b" " * (header_size - len(header))
+
+    temp = f"{path}.tmp"
+    with open(temp, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for name, dtype in SECTIONS:
+            f.write(b"\0" * (sections[name][0] - f.tell()))
+            if name == "names":
+                f.write(b"".join(encoded))
+            elif name == "name_offsets":
+                f.write(name_offsets.data)
+            elif name == "offsets":
+                f.write(np.ascontiguousarray(offsets, dtype=np.int64).data)
+            else:
+                copy_targets(f)
+    os.replace(temp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rank a corpus through a memory-mapped edge file."
+    )
+    parser.add_argument("corpus")
+    parser.add_argument("graph", help="edge file to write and rank from")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    pages, num_links = write_crawl(args.graph, args.corpus, args.workers)
+    print(f"Wrote {pages} pages and {num_links} links to {args.graph}")
+    links = MappedLinks.load(args.graph)
+
+    ranks = links.power_iteration(DAMPING)
+    print(f"PageRank Results from Iteration ({links.iterations} sweeps)")
+    for i in np.argsort(-ranks)[:args.top]:
+        print(f"  {links.pages[i]}: {ranks[i]:.4f}")
+    ranks, _ = sample_ranks(links, DAMPING, SAMPLES)
+    print(f"PageRank Results from Sampling (n = {SAMPLES})")
+    for i in np.argsort(-ranks)[:args.top]:
+        print(f"  {links.pages[i]}: {ranks[i]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
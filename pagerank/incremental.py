@@ -0,0 +1,249 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from crawler import crawl_links
+from linkmatrix import LinkMatrix, TOLERANCE
+from pagerank import DAMPING
+
+# Name of the file in a corpus directory holding the last ranks computed
+RANK_STATE = ".ranks.json"
+VERSION = 1
+
+
+def save_state(path, corpus, ranks, damping_factor):
+    """Write `corpus`, its `ranks` dict and the damping factor to `path`."""
+    temp = f"{path}.tmp"
+    with open(temp, "w", encoding="utf-8") as f:
+        json.dump({
+            "version": VERSION,
+            "damping": damping_factor,
+            "links": {page: sorted(links) for page, links in corpus.items()},
+            "ranks": ranks,
+        }, f)
+    os.replace(temp, path)
+
+
+def load_state(path):
+    """
+    Return (corpus, ranks, damping factor) saved at `path`, or None if it
+    is missing or unreadable.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("version") != VERSION:
+        return None
+    corpus = {page: set(links) for page, links in state["links"].items()}
+    return corpus, state["ranks"], state["damping"]
+
+
+def corpus_diff(old, new):
+    """
+    Return a dict of the pages and links added to and removed from
+    corpus `old` to give corpus `new`, and the pages whose links changed.
+    """
+    added_pages = new.keys() - old.keys()
+    removed_pages = old.keys() - new.keys()
+    added_links = set()
+    removed_links = set()
+    for page in new.keys() | old.keys():
+        before = old.get(page, set())
+        after = new.get(page, set())
+        added_links.update((page, link) for link in after - before)
+        removed_links.update((page, link) for link in before - after)
+    return {
+        "added_pages": added_pages,
+        "removed_pages": removed_pages,
+        "added_links": added_links,
+        "removed_links": removed_links,
+        "changed": {page for page, _ in added_links | removed_links},
+    }
+
+
+def warm_start(links, previous):
+    """
+    Return a starting vector for `links` from a `previous` dict of ranks,
+    giving pages new to the corpus the uniform share, normalized to one.
+    """
+    n = len(links)
+    start = np.array([previous.get(page, 1 / n) for page in links.pages])
+    return start / start.sum()
+
+
+def push(links, old_corpus, ranks, damping_factor, changed,
+         tolerance=TOLERANCE, max_edges=None):
+    """
+    Update `ranks`, converged PageRank for `old_corpus`, to `links` over
+    the same pages, after the pages in `changed` changed their links.
+
+    Only the changed pages' targets start with a residual: the rank that
+    should now flow to them less what did. Each round pushes every
+    page's residual above tolerance / N on to its link targets, so work
+    stays near the change, until the residual left is below `tolerance`
+    or `max_edges` links have been followed. Residual spread evenly by
+    pages without links is collected as one uniform term and added in
+    proportion to the ranks at the end.
+
+    Return (ranks, rounds, edges followed, whether the residual left is
+    below `tolerance`).
+    """
+    n = len(links)
+    index = links.index
+    ranks = ranks.copy()
+    residual = np.zeros(n)
+    uniform = 0.0
+    for page in changed:
+        p = index[page]
+        share = damping_factor * ranks[p]
+        for corpus, sign in ((old_corpus, -1), (None, 1)):
+            if corpus is None:
+                targets = links.targets[links.offsets[p]:links.offsets[p + 1]]
+            else:
+                targets = [index[link] for link in corpus[page]]
+            if len(targets) == 0:
+                uniform += sign * share / n
+            else:
+                np.add.at(residual, targets, sign * share / len(targets))
+
+    threshold = tolerance / n
+    rounds = 0
+    edges = 0
+    converged = False
+    while max_edges is None or edges < max_edges:
+        size = np.abs(residual)
+        if size.sum() < tolerance:
+            converged = True
+            break
+        active = np.flatnonzero(size > threshold)
+        rounds += 1
+        amounts = residual[active]
+        ranks[active] += amounts
+        residual[active] = 0
+
+        # Pages without links push to everyone, through the uniform term
+        degree = links.out_degree[active]
+        dangling = degree == 0
+        uniform += damping_factor * amounts[dangling].sum() / n
+        active, amounts, degree = (
+            active[~dangling], amounts[~dangling], degree[~dangling]
+        )
+
+        residual += links.spread(active, damping_factor * amounts)
+        edges += degree.sum()
+
+    # A uniform residual c adds c * N / (1 - d) times the PageRank vector
+    ranks += uniform * n / (1 - damping_factor) * ranks / ranks.sum()
+    return ranks / ranks.sum(), rounds, int(edges), converged
+
+
+def incremental_pagerank(corpus, damping_factor, state_path,
+                         tolerance=TOLERANCE, cold=False):
+    """
+    Return PageRank for `corpus` as a dict, updating the ranks saved at
+    `state_path` rather than starting from scratch, and save the result
+    there for next time.
+
+    If only links changed, ranks are updated by local pushes; if pages
+    were added or removed, or the damping factor differs, iteration is
+    warm-started from the previous ranks. With no usable state the ranks
+    are computed cold.
+
+    Also return a dict of stats, including the power iteration sweeps,
+    any push rounds counted separately, the edge operations of both, and
+    the sweeps and edge operations of a cold run for comparison if
+    `cold` is True.
+    """
+    links = LinkMatrix.from_corpus(corpus)
+    state = load_state(state_path)
+    stats = {"pages": len(links), "links": len(links.sources)}
+    if state is None or state[2] != damping_factor:
+        if state is None:
+            stats["mode"] = "cold"
+            start = None
+        else:
+            stats["mode"] = "warm"
+            start = warm_start(links, state[1])
+        ranks = links.power_iteration(damping_factor, tolerance, start=start)
+        stats["iterations"] = links.iterations
+        stats["edge_operations"] = links.iterations * len(links.sources)
+    else:
+        old_corpus, previous, _ = state
+        diff = corpus_diff(old_corpus, corpus)
+        stats.update({
+            key: len(value) for key, value in diff.items()
+        })
+        start = warm_start(links, previous)
+        if diff["added_pages"] or diff["removed_pages"]:
+            stats["mode"] = "warm"
+            ranks = links.power_iteration(
+                damping_factor, tolerance, start=start
+            )
+            stats["iterations"] = links.iterations
+            stats["edge_operations"] = links.iterations * len(links.sources)
+        else:
+            # Push while that is cheaper than another sweep, then finish
+            # by iterating from wherever the pushes got to
+            stats["mode"] = "push"
+            ranks, rounds, edges, converged = push(
+                links, old_corpus, start, damping_factor, diff["changed"],
+                tolerance, max_edges=len(links.sources)
+            )
+            stats["push_rounds"] = rounds
+            stats["iterations"] = 0
+            if not converged:
+                stats["mode"] = "push+warm"
+                ranks = links.power_iteration(
+                    damping_factor, tolerance, start=ranks
+                )
+                stats["iterations"] = links.iterations
+                edges += links.iterations * len(links.sources)
+            stats["edge_operations"] = edges
+
+    if cold:
+        links.power_iteration(damping_factor, tolerance)
+        stats["cold_iterations"] = links.iterations
+        stats["cold_edge_operations"] = links.iterations * len(links.sources)
+        stats["iterations_saved"] = (
+            stats["cold_iterations"] - stats["iterations"]
+        )
+        stats["edge_operations_saved"] = (
+            stats["cold_edge_operations"] - stats["edge_operations"]
+        )
+
+    result = links.to_dict(ranks)
+    save_state(state_path, corpus, result, damping_factor)
+    return result, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Update PageRank for a corpus from its last ranks."
+    )
+    parser.add_argument("corpus")
+    parser.add_argument(
+        "--state", help=f"rank file (default: {RANK_STATE} in the corpus)"
+    )
+    parser.add_argument(
+        "--cold", action="store_true",
+        help="also run from scratch and report the work saved"
+    )
+    args = parser.parse_args()
+    state = args.state or os.path.join(args.corpus, RANK_STATE)
+
+    corpus, _ = crawl_links(args.corpus)
+    ranks, stats = incremental_pagerank(
+        corpus, DAMPING, state, cold=args.cold
+    )
+    for key, value in stats.items():
+        print(f"{key}: {value}")
+    for page in sorted(ranks)[:20]:
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
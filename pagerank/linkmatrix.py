@@ -0,0 +1,131 @@
+import numpy as np
+
+# Default L1 change between sweeps below which power iteration stops,
+# and the most sweeps it will make
+TOLERANCE = 1e-8
+MAX_ITERATIONS = 1000
+
+
+class LinkMatrix():
+    """
+    Column-stochastic link matrix of a corpus, stored as parallel edge
+    arrays rather than a dense N x N matrix.
+
+    Page `sources[k]` links to page `targets[k]` with transition
+    probability `weights[k]`, one over the number of links on the
+    source page. Edges are sorted by source, so `offsets` also gives
+    each page's links as a slice of `targets`.
+
+    Pages without links, flagged in `dangling`, are treated as linking
+    to every page, which is applied as a rank-one correction instead of
+    being stored as N edges each.
+    """
+
+    def __init__(self, pages, sources, targets):
+        # Group edges by source page, so each page's links are a slice
+        if np.any(sources[1:] < sources[:-1]):
+            order = np.argsort(sources, kind="stable")
+            sources, targets = sources[order], targets[order]
+        self.pages = pages
+        self.index = {page: i for i, page in enumerate(pages)}
+        self.sources = sources
+        self.targets = targets
+
+        # Page p links to targets[offsets[p]:offsets[p + 1]]
+        out_degree = np.bincount(sources, minlength=len(pages))
+        self.out_degree = out_degree
+        self.offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+        np.cumsum(out_degree, out=self.offsets[1:])
+        self.dangling = out_degree == 0
+        self.weights = 1 / out_degree[sources]
+
+        # Number of sweeps made by the most recent `power_iteration`
+        self.iterations = 0
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """Build the link matrix of a corpus as returned by `crawl`."""
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        count = sum(len(links) for links in corpus.values())
+        sources = np.empty(count, dtype=np.int32)
+        targets = np.empty(count, dtype=np.int32)
+        k = 0
+        for page in pages:
+            links = corpus[page]
+            sources[k:k + len(links)] = index[page]
+            targets[k:k + len(links)] = [index[link] for link in links]
+            k += len(links)
+        return cls(pages, sources, targets)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def follow(self, ranks):
+        """
+        Return the rank each page receives over links when every page
+        with links splits its rank in `ranks` evenly between them.
+        `ranks` may be one vector or a matrix with one vector per row.
+        """
+        if ranks.ndim == 2:
+            return np.stack([self.follow(row) for row in ranks])
+        spread = ranks[self.sources] * self.weights
+        return np.bincount(
+            self.targets, weights=spread, minlength=len(self.pages)
+        )
+
+    def shares(self, pages, amounts):
+        """
+        Return (targets, weights) for every link of `pages`, which must
+        all have links, when each splits the matching entry of `amounts`
+        evenly between its links. Only the links of `pages` are read.
+        """
+        degree = self.out_degree[pages]
+        first = np.cumsum(degree) - degree
+        edges = np.repeat(self.offsets[pages] - first, degree)
+        edges += np.arange(len(edges))
+        return self.targets[edges], np.repeat(amounts / degree, degree)
+
+    def spread(self, pages, amounts):
+        """
+        Return the rank each page receives when each of `pages`, which
+        must all have links, splits the matching entry of `amounts`
+        evenly between its links. Only the links of `pages` are read.
+        """
+        targets, weights = self.shares(pages, amounts)
+        return np.bincount(
+            targets, weights=weights, minlength=len(self.pages)
+        )
+
+    def multiply(self, ranks):
+        """
+        Return the distribution after one step of following links from
+        `ranks`, with dangling pages spreading their rank over all pages.
+        """
+        dangling = ranks[..., self.dangling].sum(axis=-1, keepdims=True)
+        return self.follow(ranks) + dangling / len(self.pages)
+
+    def power_iteration(self, damping_factor, tolerance=TOLERANCE,
+                        max_iterations=MAX_ITERATIONS, start=None):
+        """
+        Return the PageRank vector, starting from `start`, or from the
+        uniform distribution if it is None, and stopping once the L1
+        change between sweeps is below `tolerance` or after
+        `max_iterations` sweeps.
+        """
+        n = len(self.pages)
+        ranks = np.full(n, 1 / n) if start is None else start
+        teleport = (1 - damping_factor) / n
+        self.iterations = 0
+        while self.iterations < max_iterations:
+            self.iterations += 1
+            updated = damping_factor * self.multiply(ranks) + teleport
+            change = np.abs(updated - ranks).sum()
+            ranks = updated
+            if change < tolerance:
+                break
+        return ranks / ranks.sum()
+
+    def to_dict(self, ranks):
+        """Return a dictionary from page names to their value in `ranks`."""
+        return dict(zip(self.pages, ranks.tolist()))
@@ -1,16 +1,25 @@
-import os
-import random
-import re
 import sys
 
+from crawler import crawl_links
+from linkmatrix import LinkMatrix
+from sampling import sample_ranks
+
 DAMPING = 0.85
 SAMPLES = 10000
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
+    # With --cache, links are cached in the corpus directory for later runs
+    args = sys.argv[1:]
+    cache = "--cache" in args
+    if cache:
+        args.remove("--cache")
+    if len(args) != 1:
+        sys.exit("Usage: python pagerank.py [--cache] corpus")
+    corpus, stats = crawl_links(args[0], cache=cache)
+    print(f"Crawled {stats['files']} pages ({stats['parsed']} parsed, "
+          f"{stats['cached']} cached) at "
+          f"{stats['files_per_second']:.0f} files per second")
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
@@ -21,30 +30,14 @@ def main():
         print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, cache=False):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
-    a list of all other pages in the corpus that are linked to by the page.
+    a set of all other pages in the corpus that are linked to by the page.
+    If `cache` is True, links are cached in the directory for later crawls.
     """
-    pages = dict()
-
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
-
-    # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
-        )
-
+    pages, _ = crawl_links(directory, cache=cache)
     return pages
 
 
@@ -85,24 +78,10 @@ def sample_pagerank(corpus, damping_factor, n):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    # Choose a page at random from the corpus
-    page = random.choice(list(corpus.keys()))
-    # Create an empty counter for the pages
-    page_counter = {}
-    for page_i in list(corpus.keys()):
-        page_counter.update({page_i:0})
-    # Iterate through n number of trials, updating count for the 
-    # current page and randomly choosing a new page using weights from
-    # the transition model
-    for _ in range(n):
-        page_counter[page] += 1/n
-        weights = list(transition_model(corpus,page,damping_factor).values())
-        page = random.choices(list(corpus.keys()),weights=weights)[0]
-    return page_counter
-
-
-
-    raise NotImplementedError
+    # Walk many random surfers at once, each step costing O(1) per surfer
+    links = LinkMatrix.from_corpus(corpus)
+    ranks, _ = sample_ranks(links, damping_factor, n)
+    return links.to_dict(ranks)
 
 
 def iterate_pagerank(corpus, damping_factor):
@@ -114,31 +93,10 @@ def iterate_pagerank(corpus, damping_factor):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    # Initialize pages with probability of 1/N
-    prob = {}
-    change = {}
-    # Establish common variables
-    for page in list(corpus.keys()):
-        prob.update({page:(1/len(corpus))})
-        change.update({page:999})
-    # Begin iterative algorithm
-    while max(list(change.values())) > 0.001:
-        for page in list(corpus.keys()):
-            summation = 0
-            for page_iter in list(corpus.keys()):
-                # Case if no links on page, treat as equal probability to link to any page, including itself
-                if len(corpus[page_iter]) == 0:
-                    summation += 1/len(corpus)
-                # Case if a page links back to the current page
-                elif page in corpus[page_iter]:
-                    summation += prob[page_iter]/len(corpus[page_iter])
-            temp_prob = (1-damping_factor)/len(corpus) + damping_factor*summation
-            change[page] = abs(prob[page]-temp_prob)
-            prob[page] = temp_prob
-    return prob
-            
-            
-    raise NotImplementedError
+    # Power iteration over a sparse link matrix, with pages that have
+    # no links treated as linking to every page, including themselves
+    links = LinkMatrix.from_corpus(corpus)
+    return links.to_dict(links.power_iteration(damping_factor))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,141 @@
+import argparse
+
+import numpy as np
+
+from crawler import crawl_links
+from linkmatrix import LinkMatrix, MAX_ITERATIONS, TOLERANCE
+from pagerank import DAMPING
+
+
+def teleport_matrix(links, seed_sets):
+    """
+    Return a K x N matrix whose rows teleport uniformly to the pages in
+    each of the K `seed_sets`, given as collections of page names.
+    """
+    teleports = np.zeros((len(seed_sets), len(links)))
+    for k, seeds in enumerate(seed_sets):
+        if not seeds:
+            raise ValueError(f"seed set {k} is empty")
+        pages = list({links.index[page] for page in seeds})
+        teleports[k, pages] = 1 / len(pages)
+    return teleports
+
+
+def personalized_pagerank(links, damping_factor, teleports,
+                          tolerance=TOLERANCE,
+                          max_iterations=MAX_ITERATIONS):
+    """
+    Return a K x N matrix of personalized PageRank vectors, one for each
+    row of `teleports`, the distribution each random surfer jumps to
+    instead of the uniform one. Pages without links also send surfers
+    to that distribution.
+
+    All K vectors are iterated together over the same link arrays, and
+    each stops once its L1 change between sweeps is below `tolerance`,
+    so converged vectors drop out of later sweeps.
+    """
+    ranks = teleports.copy()
+    active = np.arange(len(teleports))
+    links.iterations = 0
+    while len(active) and links.iterations < max_iterations:
+        links.iterations += 1
+        current = ranks[active]
+        teleport = teleports[active]
+        dangling = current[:, links.dangling].sum(axis=1, keepdims=True)
+        updated = (
+            damping_factor * (links.follow(current) + dangling * teleport)
+            + (1 - damping_factor) * teleport
+        )
+        change = np.abs(updated - current).sum(axis=1)
+        ranks[active] = updated
+        active = active[change >= tolerance]
+    return ranks / ranks.sum(axis=1, keepdims=True)
+
+
+def forward_push(links, damping_factor, seeds, epsilon=1e-6):
+    """
+    Approximate the personalized PageRank vector for the page indices in
+    `seeds` by pushing rank outwards from them.
+
+    Every page holds a residual, starting at the teleport distribution.
+    In each round, all pages whose residual exceeds `epsilon` times
+    their number of links keep (1 - d) of it, and pass the rest on along
+    their links, or back to the seeds if they have none. Only the pages
+    reached by the last round are checked against the threshold, so
+    only pages near the seeds are ever touched. Return the ranks,
+    normalized to sum to one, and the number of links followed.
+    """
+    seeds = np.unique(seeds)
+    n = len(links)
+    ranks = np.zeros(n)
+    residual = np.zeros(n)
+    residual[seeds] = 1 / len(seeds)
+    limit = epsilon * np.maximum(links.out_degree, 1)
+    edges = 0
+    active = seeds[residual[seeds] > limit[seeds]]
+    while len(active):
+        amounts = residual[active]
+        residual[active] = 0
+        ranks[active] += (1 - damping_factor) * amounts
+        dangling = links.dangling[active]
+        reached = [active[:0]]
+        if dangling.any():
+            residual[seeds] += (
+                damping_factor * amounts[dangling].sum() / len(seeds)
+            )
+            reached.append(seeds)
+        active, amounts = active[~dangling], amounts[~dangling]
+        targets, shares = links.shares(active, damping_factor * amounts)
+        edges += len(targets)
+
+        # Sum the shares over the distinct pages reached, which are the
+        # only ones that can cross their threshold in this round
+        targets, inverse = np.unique(targets, return_inverse=True)
+        residual[targets] += np.bincount(
+            inverse, weights=shares, minlength=len(targets)
+        )
+        reached.append(targets)
+        active = np.unique(np.concatenate(reached))
+        active = active[residual[active] > limit[active]]
+    return ranks / ranks.sum(), int(edges)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rank pages of a corpus for each of several seed sets."
+    )
+    parser.add_argument("corpus")
+    parser.add_argument(
+        "seeds", nargs="+",
+        help="comma-separated pages to teleport to, one argument per set"
+    )
+    parser.add_argument(
+        "--push", type=float, metavar="EPSILON",
+        help="approximate each set by forward push with this threshold"
+    )
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus, _ = crawl_links(args.corpus)
+    links = LinkMatrix.from_corpus(corpus)
+    seed_sets = [seeds.split(",") for seeds in args.seeds]
+    if args.push is None:
+        ranks = personalized_pagerank(
+            links, DAMPING, teleport_matrix(links, seed_sets)
+        )
+    else:
+        ranks = np.stack([
+            forward_push(
+                links, DAMPING, [links.index[page] for page in seeds],
+                args.push
+            )[0]
+            for seeds in seed_sets
+        ])
+    for k, seeds in enumerate(seed_sets):
+        print(f"Seeds: {', '.join(seeds)}")
+        for i in np.argsort(-ranks[k])[:args.top]:
+            print(f"  {links.pages[i]}: {ranks[k, i]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import math
+import multiprocessing
+
+import numpy as np
+
+# Default number of random surfers walked side by side, and the number
+# of steps each takes between checks of the estimate's standard error
+WALKERS = 4096
+BATCH = 16
+
+# Fewest batches used to estimate the standard error before stopping
+MIN_BATCHES = 4
+
+# Surfers start on uniformly random pages, whose influence on where they
+# are shrinks by the damping factor each step; they are walked without
+# counting until it is below this
+BURN_IN_ERROR = 1e-4
+
+# Link matrix of a worker process started by `parallel_sample_ranks`
+shared_links = None
+
+
+class Walkers():
+    """
+    Many independent random surfers on a `LinkMatrix`, advanced together
+    one step at a time with vectorized NumPy draws.
+
+    Each step costs O(1) per surfer: one draw decides whether to follow
+    a link or jump to a random page, and one more picks either a link,
+    as an offset into the page's slice of `targets`, or the page.
+    """
+
+    def __init__(self, links, damping_factor, walkers, rng):
+        self.links = links
+        self.damping_factor = damping_factor
+        self.rng = rng
+
+        # Every surfer starts on a page chosen at random
+        self.positions = rng.integers(0, len(links), walkers)
+        for _ in range(burn_in(damping_factor)):
+            self.step()
+
+    def step(self):
+        """Move every surfer to their next page."""
+        links = self.links
+        rng = self.rng
+        positions = self.positions
+        degree = links.out_degree[positions]
+
+        # Surfers on pages without links always jump
+        jump = (rng.random(len(positions)) >= self.damping_factor)
+        jump |= degree == 0
+        choice = rng.random(len(positions))
+        follow = ~jump
+        edges = (
+            links.offsets[positions[follow]]
+            + (choice[follow] * degree[follow]).astype(np.int64)
+        )
+        positions[follow] = links.targets[edges]
+        positions[jump] = (choice[jump] * len(links)).astype(np.int64)
+
+    def walk(self, steps):
+        """
+        Take `steps` steps, counting the page every surfer is on before
+        each one. Return the visit counts for every page.
+        """
+        visited = np.empty((steps, len(self.positions)), dtype=np.int64)
+        for i in range(steps):
+            visited[i] = self.positions
+            self.step()
+        return np.bincount(visited.ravel(), minlength=len(self.links))
+
+
+def burn_in(damping_factor):
+    """Return the number of uncounted steps surfers take to start with."""
+    if not 0 < damping_factor < 1:
+        return 0
+    return math.ceil(math.log(BURN_IN_ERROR) / math.log(damping_factor))
+
+
+def sample_ranks(links, damping_factor, n, walkers=WALKERS, tolerance=None,
+                 seed=None):
+    """
+    Estimate PageRank on `links` from `n` samples spread over up to
+    `walkers` random surfers, stopping early once the largest standard
+    error of any page's estimate is below `tolerance`, if one is given.
+
+    The standard error is estimated from the spread between batches of
+    `BATCH` steps. Return (ranks, number of samples taken).
+    """
+    rng = np.random.default_rng(seed)
+    walkers = max(1, min(walkers, n))
+    surfers = Walkers(links, damping_factor, walkers, rng)
+    steps = math.ceil(n / walkers)
+
+    counts = np.zeros(len(links), dtype=np.int64)
+    totals = np.zeros(len(links))
+    squares = np.zeros(len(links))
+    batches = 0
+    taken = 0
+    while taken < steps:
+        batch = min(BATCH, steps - taken)
+        visits = surfers.walk(batch)
+        counts += visits
+        taken += batch
+        if tolerance is None:
+            continue
+
+        # Batch means: each batch's visit shares are a separate estimate
+        estimate = visits / (batch * walkers)
+        totals += estimate
+        squares += estimate ** 2
+        batches += 1
+        if batches >= MIN_BATCHES:
+            mean = totals / batches
+            variance = np.maximum(squares / batches - mean ** 2, 0)
+            error = np.sqrt(variance / (batches - 1))
+            if error.max() < tolerance:
+                break
+    samples = taken * walkers
+    return counts / samples, samples
+
+
+def init_worker(links):
+    """Keep the link matrix in a worker process for `sample_share`."""
+    global shared_links
+    shared_links = links
+
+
+def sample_share(args):
+    """Run `sample_ranks` on the worker's link matrix; return raw counts."""
+    damping_factor, n, walkers, tolerance, seed = args
+    ranks, samples = sample_ranks(
+        shared_links, damping_factor, n, walkers, tolerance, seed
+    )
+    return ranks * samples, samples
+
+
+def parallel_sample_ranks(links, damping_factor, n, processes,
+                          walkers=WALKERS, tolerance=None, seed=None):
+    """
+    Split `sample_ranks` over `processes` worker processes, each taking
+    its share of the samples with its own random stream, and merge the
+    visit counts. Each worker stops early at a tolerance scaled up by
+    the square root of `processes`, since merging that many independent
+    estimates divides the standard error by it.
+
+    Return (ranks, number of samples taken).
+    """
+    if processes <= 1:
+        return sample_ranks(links, damping_factor, n, walkers, tolerance,
+                            seed)
+    seeds = np.random.SeedSequence(seed).spawn(processes)
+    share = math.ceil(n / processes)
+    if tolerance is not None:
+        tolerance *= math.sqrt(processes)
+    tasks = [
+        (damping_factor, share, max(1, walkers // processes), tolerance, s)
+        for s in seeds
+    ]
+
+    # Forked workers share the link arrays copy-on-write
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    with context.Pool(
+        processes, initializer=init_worker, initargs=(links,)
+    ) as pool:
+        results = pool.map(sample_share, tasks)
+    counts = sum(counts for counts, _ in results)
+    samples = sum(samples for _, samples in results)
+    return counts / samples, samples
@@ -0,0 +1,237 @@
+import argparse
+import time
+
+import numpy as np
+
+from crawler import crawl_links
+from linkmatrix import LinkMatrix, MAX_ITERATIONS, TOLERANCE
+from pagerank import DAMPING
+
+# Largest number of pages Gauss-Seidel updates together, using the
+# latest values of every page before them
+GAUSS_SEIDEL_BLOCK = 1024
+
+# Number of sweeps between extrapolations, once enough have been made
+EXTRAPOLATE_EVERY = 10
+
+NORMS = {
+    "l1": lambda change: np.abs(change).sum(),
+    "linf": lambda change: np.abs(change).max(),
+}
+
+
+def solve(links, damping_factor, method="jacobi", tolerance=TOLERANCE,
+          norm="l1", max_iterations=MAX_ITERATIONS, start=None):
+    """
+    Return (ranks, telemetry) for the PageRank of `links` by `method`,
+    one of `METHODS`, stopping once the change between sweeps measured
+    by `norm`, "l1" or "linf", is below `tolerance`, or after
+    `max_iterations` sweeps.
+
+    `telemetry` is a dict of the method, number of sweeps, whether it
+    converged, the seconds taken, the residual after each sweep, and for
+    the extrapolation methods how many extrapolations were kept and
+    thrown away.
+
+    An extrapolated estimate costs one sweep to check, and is kept only
+    if its residual is below that of the plain sweep it would replace,
+    so extrapolation can never slow convergence by more than that sweep.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown method: {method}")
+    measure = NORMS[norm]
+    n = len(links)
+    ranks = np.full(n, 1 / n) if start is None else start.copy()
+    sweep = METHODS[method](links, damping_factor)
+    history = []
+    residuals = []
+    kept = rejected = 0
+    converged = False
+    begin = time.perf_counter()
+    while len(residuals) < max_iterations:
+        updated = sweep(ranks)
+        residuals.append(float(measure(updated - ranks)))
+        ranks = updated
+        if residuals[-1] < tolerance:
+            converged = True
+            break
+        if method not in ("aitken", "quadratic"):
+            continue
+        history = (history + [ranks])[-4:]
+        sweeps = len(residuals)
+        if sweeps % EXTRAPOLATE_EVERY or sweeps >= max_iterations:
+            continue
+
+        # The sweep from the extrapolated estimate measures its residual
+        # and, if it is kept, carries on from there
+        estimate = extrapolate(method, history, ranks)
+        history = []
+        if estimate is ranks:
+            continue
+        checked = sweep(estimate)
+        residual = float(measure(checked - estimate))
+        if residual < residuals[-1]:
+            kept += 1
+            residuals.append(residual)
+            ranks = checked
+            if residual < tolerance:
+                converged = True
+                break
+        else:
+            # The checking sweep still counts, but the iterate and its
+            # residual are those of the plain sweep
+            rejected += 1
+            residuals.append(residuals[-1])
+    telemetry = {
+        "method": method,
+        "iterations": len(residuals),
+        "converged": converged,
+        "seconds": time.perf_counter() - begin,
+        "residuals": residuals,
+    }
+    if method in ("aitken", "quadratic"):
+        telemetry["extrapolations"] = kept
+        telemetry["rejected"] = rejected
+    return ranks / ranks.sum(), telemetry
+
+
+def jacobi(links, damping_factor):
+    """Return a function making one power iteration sweep."""
+    teleport = (1 - damping_factor) / len(links)
+
+    def sweep(ranks):
+        return damping_factor * links.multiply(ranks) + teleport
+
+    return sweep
+
+
+def gauss_seidel(links, damping_factor, block=GAUSS_SEIDEL_BLOCK):
+    """
+    Return a function making one ordered Gauss-Seidel sweep, updating
+    pages in index order, `block` at a time, so each block already sees
+    the new ranks of every page before it.
+    """
+    n = len(links)
+    block = max(1, min(block, n // 64))
+    teleport = (1 - damping_factor) / n
+    sources = np.repeat(np.arange(n), links.out_degree)
+
+    # Incoming links grouped by target, so each block's are one slice
+    order = np.argsort(links.targets, kind="stable")
+    in_sources = sources[order]
+    in_targets = np.asarray(links.targets)[order]
+    in_offsets = np.searchsorted(in_targets, np.arange(0, n + block, block))
+    share = np.zeros(n)
+    share[~links.dangling] = 1 / links.out_degree[~links.dangling]
+
+    def sweep(ranks):
+        ranks = ranks.copy()
+        dangling = ranks[links.dangling].sum()
+        for k, start in enumerate(range(0, n, block)):
+            end = min(n, start + block)
+            first, last = in_offsets[k], in_offsets[k + 1]
+            senders = in_sources[first:last]
+            received = np.bincount(
+                in_targets[first:last] - start,
+                weights=ranks[senders] * share[senders],
+                minlength=end - start
+            )
+            updated = damping_factor * (received + dangling / n) + teleport
+            dangling += (
+                updated - ranks[start:end]
+            )[links.dangling[start:end]].sum()
+            ranks[start:end] = updated
+
+        # Unlike a power iteration sweep, this does not keep the total
+        # at one, and errors in the total would otherwise only shrink by
+        # the damping factor each sweep
+        return ranks / ranks.sum()
+
+    return sweep
+
+
+def extrapolate(method, history, ranks):
+    """
+    Return an extrapolated estimate from the last few sweeps in
+    `history`, or `ranks` if there are not yet enough of them.
+
+    Aitken's delta-squared method extrapolates from the last three
+    sweeps, taking the changes to shrink by one common ratio;
+    quadratic extrapolation fits the last four to the first three
+    eigenvectors of the link matrix.
+    """
+    if method == "aitken" and len(history) >= 3:
+        x0, x1, x2 = history[-3:]
+        before, after = x1 - x0, x2 - x1
+
+        # One ratio of successive changes for the whole vector, fit by
+        # least squares, sums the geometric tail of every page's changes
+        # at once; a ratio outside (0, 1) is not shrinking geometrically
+        ratio = np.dot(after, before) / np.dot(before, before)
+        if not 0 < ratio < 1:
+            return ranks
+        result = x2 + after * ratio / (1 - ratio)
+    elif method == "quadratic" and len(history) == 4:
+        x0, x1, x2, x3 = history
+        y = np.column_stack((x1 - x0, x2 - x0))
+        gamma = np.linalg.lstsq(y, -(x3 - x0), rcond=None)[0]
+        g1, g2, g3 = gamma[0], gamma[1], 1.0
+        result = (g1 + g2 + g3) * x1 + (g2 + g3) * x2 + g3 * x3
+    else:
+        return ranks
+
+    # Extrapolation can overshoot; keep a distribution
+    result = np.maximum(result, 0)
+    return result / result.sum()
+
+
+# Sweep each method makes; the extrapolation methods extrapolate every
+# EXTRAPOLATE_EVERY power iteration sweeps
+METHODS = {
+    "jacobi": jacobi,
+    "gauss-seidel": gauss_seidel,
+    "aitken": jacobi,
+    "quadratic": jacobi,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare PageRank solvers on a corpus."
+    )
+    parser.add_argument("corpus")
+    parser.add_argument(
+        "--method", choices=list(METHODS) + ["all"], default="all"
+    )
+    parser.add_argument("--damping", type=float, default=DAMPING)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--norm", choices=list(NORMS), default="l1")
+    parser.add_argument(
+        "--max-iterations", type=int, default=MAX_ITERATIONS
+    )
+    parser.add_argument(
+        "--telemetry", action="store_true",
+        help="print the residual after every sweep"
+    )
+    args = parser.parse_args()
+
+    corpus, _ = crawl_links(args.corpus)
+    links = LinkMatrix.from_corpus(corpus)
+    methods = list(METHODS) if args.method == "all" else [args.method]
+    print(f"{'method':<14}{'sweeps':>8}{'seconds':>10}{'residual':>12}")
+    for method in methods:
+        _, telemetry = solve(
+            links, args.damping, method, args.tolerance, args.norm,
+            args.max_iterations
+        )
+        residuals = telemetry["residuals"]
+        print(f"{method:<14}{telemetry['iterations']:>8}"
+              f"{telemetry['seconds']:>10.4f}{residuals[-1]:>12.2e}"
+              f"{'' if telemetry['converged'] else '  (not converged)'}")
+        if args.telemetry:
+            for i, residual in enumerate(residuals, 1):
+                print(f"  {i:>6}  {residual:.3e}")
+
+
+if __name__ == "__main__":
+    main()
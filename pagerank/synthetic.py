@@ -0,0 +1,88 @@
+import argparse
+import math
+import os
+import random
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+    <head>
+        <title>{title}</title>
+    </head>
+    <body>
+        <h1>{title}</h1>
+{links}
+    </body>
+</html>
+"""
+
+
+def generate(directory, num_pages, links=8, dangling=0.1, seed=0):
+    """
+    Write a corpus of `num_pages` HTML pages to `directory`, with links
+    following preferential attachment: each link goes to a page with
+    probability proportional to one more than the links it already
+    has, so a few pages collect most of them.
+
+    A share `dangling` of pages have no links; the rest have one or more,
+    drawn from a geometric distribution with mean `links`.
+    Return the number of links written.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    names = [f"{page}.html" for page in range(num_pages)]
+
+    # Every page starts in the urn once and is added again for each link
+    # to it, so drawing from the urn is drawing by in-degree plus one
+    urn = list(range(num_pages))
+    order = list(range(num_pages))
+    rng.shuffle(order)
+    total = 0
+    for page in order:
+        count = 0
+        if rng.random() >= dangling:
+            count = 1
+            if links > 1:
+                count += int(
+                    math.log(1 - rng.random()) / math.log(1 - 1 / links)
+                )
+        targets = set()
+        for _ in range(count):
+            target = urn[rng.randrange(len(urn))]
+            if target != page:
+                targets.add(target)
+        urn.extend(targets)
+        total += len(targets)
+
+        anchors = "\n".join(
+            f'        <a href="{names[target]}">Page {target}</a>'
+            for target in sorted(targets)
+        )
+        with open(os.path.join(directory, names[page]), "w") as f:
+            f.write(PAGE.format(title=f"Page {page}", links=anchors))
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic corpus of linked HTML pages."
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--pages", type=int, default=10000)
+    parser.add_argument(
+        "--links", type=float, default=8,
+        help="average number of links on pages with links (default: 8)"
+    )
+    parser.add_argument(
+        "--dangling", type=float, default=0.1,
+        help="share of pages with no links (default: 0.1)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    links = generate(
+        args.directory, args.pages, args.links, args.dangling, args.seed
+    )
+    print(f"Wrote {args.pages} pages and {links} links to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import unittest
+
+import numpy as np
+
+import solvers
+from linkmatrix import LinkMatrix
+
+
+def cycle(n):
+    """Return the link matrix of `n` pages each linking to the next."""
+    pages = np.arange(n, dtype=np.int32)
+    return LinkMatrix([str(p) for p in pages], pages, (pages + 1) % n)
+
+
+def clusters(n, seed=0):
+    """
+    Return the link matrix of two random clusters of `n` pages each,
+    joined by a single link each way, so rank mixes between them slowly.
+    """
+    rng = np.random.default_rng(seed)
+    sources = np.repeat(np.arange(2 * n), 4)
+    offset = np.where(sources < n, 0, n)
+    targets = offset + rng.integers(0, n, len(sources))
+    sources = np.append(sources, [0, n])
+    targets = np.append(targets, [n, 0])
+    pages = [str(p) for p in range(2 * n)]
+    return LinkMatrix(
+        pages, sources.astype(np.int32), targets.astype(np.int32)
+    )
+
+
+class SolveTest(unittest.TestCase):
+
+    DAMPING = 0.99
+    TOLERANCE = 1e-6
+    MAX_ITERATIONS = 5000
+
+    def check_converges(self, links, start=None):
+        jacobi = solvers.solve(
+            links, self.DAMPING, "jacobi", self.TOLERANCE,
+            max_iterations=self.MAX_ITERATIONS, start=start
+        )[1]
+        exact = solvers.solve(
+            links, self.DAMPING, "jacobi", 1e-12,
+            max_iterations=10 * self.MAX_ITERATIONS, start=start
+        )[0]
+        for method in solvers.METHODS:
+            with self.subTest(method=method):
+                ranks, telemetry = solvers.solve(
+                    links, self.DAMPING, method, self.TOLERANCE,
+                    max_iterations=self.MAX_ITERATIONS, start=start
+                )
+                self.assertTrue(telemetry["converged"])
+                self.assertLess(telemetry["residuals"][-1], self.TOLERANCE)
+
+                # Each extrapolation costs at most its checking sweep
+                self.assertLessEqual(
+                    telemetry["iterations"],
+                    jacobi["iterations"]
+                    + jacobi["iterations"] // solvers.EXTRAPOLATE_EVERY
+                )
+                self.assertLess(np.abs(ranks - exact).sum(), 1e-3)
+
+    def test_cycle(self):
+        n = 5000
+        start = np.random.default_rng(0).random(n)
+        self.check_converges(cycle(n), start / start.sum())
+
+    def test_clusters(self):
+        self.check_converges(clusters(200))
+
+
+if __name__ == "__main__":
+    unittest.main()